@@ -1,10 +1,16 @@
-from typing import Optional
-from pydantic_ai import Agent, RunContext
+from pydantic_ai import Agent, ModelRetry, RunContext
 from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 import logfire
 
-from src.utils import perform_vector_search, perform_fts_search, build_context_from_results, read_files_as_object_array
+from src.utils import (
+    aperform_hybrid_search,
+    build_context_from_results,
+    cache_answer,
+    get_answer_cache,
+    get_cached_answer,
+    list_pokemon,
+)
 
 from dotenv import load_dotenv
 import nest_asyncio
@@ -19,38 +25,54 @@ logfire.instrument_pydantic_ai()
 ollama_model = OpenAIModel(
     model_name='qwen3:32b', 
     provider=OpenAIProvider(base_url='http://localhost:11434/v1'))
+# The run's deps collect the files its answer was built from, which are
+# recorded with the cached answer
 agent = Agent(
     model=ollama_model,
     retries=5,
+    deps_type=set[str],
     system_prompt=(
         'You are a helpful AI assistant. '
-        'Help get the right information using the vector similarity search and keyword search capabilities. '
+        'Help get the right information using the search tool, which combines vector similarity search and keyword search. '
     ),
 )
 
 @agent.system_prompt
-async def add_customer_details(ctx: RunContext[None]):
-    files = read_files_as_object_array('data/')
+async def add_customer_details(ctx: RunContext[set[str]]):
     return "Here's the list of pokemons you can search for:\n" + \
-        "\n".join([f"{file['filename'].split('.')[0]}" for file in files])
+        "\n".join(list_pokemon())
+
+@agent.tool
+async def perform_search(ctx: RunContext[set[str]], query: str, pokemon: list[str]) -> list[str]:
+    """Searches the moves of one or more pokemon, e.g. ["pikachu", "charizard"] to compare them."""
+    print(f"Performing hybrid search for query: {query}, pokemon: {pokemon}")
+    # Filenames keep the corpus' case, whatever spelling the model used
+    known = {name.lower(): name for name in list_pokemon()}
+    unknown = [name for name in pokemon if name.strip().lower() not in known]
+    if unknown:
+        raise ModelRetry(f"Unknown pokemon {', '.join(map(repr, unknown))}, use one of: {', '.join(known.values())}")
+    filenames = [known[name.strip().lower()] + ".md" for name in pokemon]
+    # One search covers every pokemon, with top_k scaled by how many there are
+    results = await aperform_hybrid_search(query, pokemon=filenames, top_k=5 * max(1, len(filenames)))
+    return build_context_from_results(results, sources=ctx.deps)
+
 
-@agent.tool_plain
-def perform_similarity_search(query: str, pokemon: Optional[str]) -> list[str]:
-    print(f"Performing similarity search for query: {query}, pokemon: {pokemon}")
-    results = perform_vector_search(query, pokemon=pokemon+".md", top_k=5)
-    return build_context_from_results(results)
+def ask(question: str) -> str:
+    # Rephrasings of an earlier question are answered without any LLM call
+    cached = get_cached_answer(question)
+    if cached is not None:
+        print("(answered from the semantic cache)")
+        return cached
 
-@agent.tool_plain
-def perform_keyword_search(query: str, pokemon: Optional[str]) -> list[str]:
-    print(f"Performing keyword search for query: {query}, pokemon: {pokemon}")
-    results = perform_fts_search(query, pokemon=pokemon+".md", top_k=5)
-    return build_context_from_results(results)
+    sources = set()
+    result = agent.run_sync(question, deps=sources)
+    result.all_messages()
+    cache_answer(question, result.output, sources)
+    return result.output
 
 
-result = agent.run_sync("What are the electric-type moves of Pikachu?")
-result.all_messages()
-print(result.output)
+print(ask("What are the electric-type moves of Pikachu?"))
+print(ask("Which electric type attacks does Pikachu learn?"))
 
-result = agent.run_sync("Who has more powerful normali type attack - Charizard or Pikachu?")
-result.all_messages()
-print(result.output)
+print(ask("Who has more powerful normali type attack - Charizard or Pikachu?"))
+print(f"Answer cache: {get_answer_cache().stats()}")
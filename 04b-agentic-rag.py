@@ -4,9 +4,20 @@ from pydantic_ai.models.openai import OpenAIModel
 from pydantic_ai.providers.openai import OpenAIProvider
 from pydantic import BaseModel, Field
 from typing import List
+import asyncio
+import os
+import time
 import logfire
 
-from src.utils import perform_vector_search, perform_fts_search, build_context_from_results, read_files_as_object_array
+from src.utils import (
+    acache_answer,
+    aget_cached_answer,
+    aperform_hybrid_search,
+    build_context_from_results,
+    get_answer_cache,
+    get_retrieval_context,
+    list_pokemon,
+)
 
 from dotenv import load_dotenv
 import nest_asyncio
@@ -24,9 +35,22 @@ ollama_model = OpenAIModel(
 
 # ollama_model = OpenAIModel('gpt-4o')
 
+# Subquestions retrieved and extracted at the same time
+SUBQUESTION_CONCURRENCY = int(os.getenv("SUBQUESTION_CONCURRENCY", "4"))
+# "agentic" lets retriever_agent pick the search arguments, "direct" searches
+# with the ones the planner already chose, without another LLM conversation
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "agentic")
+
 ### Planner Agent
+class Subquestion(BaseModel):
+    question: str = Field(description="A subquestion that can be answered on its own")
+    pokemon: Optional[str] = Field(
+        description="The one pokemon the subquestion is about, exactly as in the list, or null if it is about none"
+    )
+    search_query: str = Field(description="Short search query for the moves that answer the subquestion")
+
 class Subquestions(BaseModel):
-    subquestions: List[str]
+    subquestions: List[Subquestion]
 
 planner_agent = Agent(
     model=ollama_model,
@@ -36,49 +60,62 @@ planner_agent = Agent(
         'You are a helpful AI agent that plans a query into subqueries. '
         'You need to decompose the user query into subquestions where each subquestion can be answered independently. '
         'Try to keep the subquestions as few as possible while ensuring they cover the original query comprehensively. '
+        'Each subquestion is about at most one pokemon; give its name and a short search query for the subquestion. '
     ),
 )
 
 @planner_agent.system_prompt
 async def add_pokemon_list(ctx: RunContext[None]):
-    files = read_files_as_object_array('data/')
     return "Here's the list of all pokemons:\n" + \
-        "\n".join([f"{file['filename'].split('.')[0]}" for file in files])
+        "\n".join(list_pokemon())
 
 @planner_agent.output_validator
 async def validate_subquestions(subquestions: Subquestions) -> bool:
     if not subquestions.subquestions:
         raise ModelRetry("Subquestions list cannot be empty.")
+    # Names are matched case-insensitively and replaced by the name in the
+    # corpus, whose filename the search filters on
+    known = {name.lower(): name for name in list_pokemon()}
+    for subquestion in subquestions.subquestions:
+        if subquestion.pokemon is not None:
+            name = subquestion.pokemon.strip().lower()
+            if name not in known:
+                raise ModelRetry(f"Unknown pokemon {subquestion.pokemon!r}, use one of: {', '.join(known.values())}")
+            subquestion.pokemon = known[name]
     return subquestions
 
 
 ## Retriever Agent
+# The run's deps collect the files its context was built from, which are
+# recorded with the cached answer
 retriever_agent = Agent(
     model=ollama_model,
     retries=5,
+    deps_type=set[str],
     system_prompt=(
         'You are a helpful AI assistant. '
-        'Help get the right information using the vector similarity search and keyword search capabilities. '
+        'Help get the right information using the search tool, which combines vector similarity search and keyword search. '
     ),
 )
 
 @retriever_agent.system_prompt
-async def add_pokemon_list(ctx: RunContext[None]):
-    files = read_files_as_object_array('data/')
+async def add_pokemon_list(ctx: RunContext[set[str]]):
     return "Here's the list of pokemons you can search for:\n" + \
-        "\n".join([f"{file['filename'].split('.')[0]}" for file in files])
-
-@retriever_agent.tool_plain
-def perform_similarity_search(query: str, pokemon: str) -> list[str]:
-    print(f"Performing similarity search for query: {query}, pokemon: {pokemon}")
-    results = perform_vector_search(query, pokemon=pokemon+".md", top_k=5)
-    return build_context_from_results(results)
-
-@retriever_agent.tool_plain
-def perform_keyword_search(query: str, pokemon: str) -> list[str]:
-    print(f"Performing keyword search for query: {query}, pokemon: {pokemon}")
-    results = perform_fts_search(query, pokemon=pokemon+".md", top_k=5)
-    return build_context_from_results(results)
+        "\n".join(list_pokemon())
+
+@retriever_agent.tool
+async def perform_search(ctx: RunContext[set[str]], query: str, pokemon: list[str]) -> list[str]:
+    """Searches the moves of one or more pokemon, e.g. ["pikachu", "charizard"] to compare them."""
+    print(f"Performing hybrid search for query: {query}, pokemon: {pokemon}")
+    # Filenames keep the corpus' case, whatever spelling the model used
+    known = {name.lower(): name for name in list_pokemon()}
+    unknown = [name for name in pokemon if name.strip().lower() not in known]
+    if unknown:
+        raise ModelRetry(f"Unknown pokemon {', '.join(map(repr, unknown))}, use one of: {', '.join(known.values())}")
+    filenames = [known[name.strip().lower()] + ".md" for name in pokemon]
+    # One search covers every pokemon, with top_k scaled by how many there are
+    results = await aperform_hybrid_search(query, pokemon=filenames, top_k=5 * max(1, len(filenames)))
+    return build_context_from_results(results, sources=ctx.deps)
 
 
 ## Extractor Agent
@@ -118,36 +155,128 @@ async def add_context(ctx: RunContext[FinaliserInput]):
     return f"Context: {ctx.deps.extracted_info}"
 
 
-### Example Usage
-
-query = "Who has more powerful normal type attack - Charizard or Pikachu?"
-# query = "Name the p okemons that learn the moves thunderbolt or growl."
-
-subquestions = planner_agent.run_sync(query)
-print("Subquestions:")
-print(subquestions.output.model_dump_json(indent=2))
-
-contexts = []
-for subquestion in subquestions.output.subquestions:
-    print(f"Retrieving context for subquestion: {subquestion}")
-    retrieved_context = retriever_agent.run_sync(subquestion)
-    print(retrieved_context.output)
-
-    prompt_for_extractor = ExtractorInput(
-        context=retrieved_context.output
+### Pipeline
+
+async def retrieve_directly(subquestion: Subquestion, sources: set[str]) -> str:
+    # Same search the retriever agent's tool runs, with the planner's arguments
+    print(f"Performing hybrid search for query: {subquestion.search_query}, pokemon: {subquestion.pokemon}")
+    pokemon = subquestion.pokemon + ".md" if subquestion.pokemon else None
+    results = await aperform_hybrid_search(subquestion.search_query, pokemon=pokemon, top_k=5)
+    return build_context_from_results(results, sources=sources)
+
+
+async def process_subquestion(
+    index: int, subquestion: Subquestion, semaphore: asyncio.Semaphore, mode: str, sources: set[str]
+) -> dict:
+    async with semaphore:
+        print(f"[{index}] Retrieving context for subquestion: {subquestion.question}")
+        llm_calls = 0
+        start = time.perf_counter()
+        if mode == "direct":
+            context = await retrieve_directly(subquestion, sources)
+        else:
+            retrieved_context = await retriever_agent.run(subquestion.question, deps=sources)
+            context = retrieved_context.output
+            llm_calls += retrieved_context.usage().requests
+        retrieved = time.perf_counter()
+        print(f"[{index}] {context}")
+
+        prompt_for_extractor = ExtractorInput(
+            context=context
+        )
+        extracted_info = await extractor_agent.run(subquestion.question, deps=prompt_for_extractor)
+        llm_calls += extracted_info.usage().requests
+        extracted = time.perf_counter()
+        print(f"[{index}] Extracted Information for '{subquestion.question}': {extracted_info.output}")
+
+    return {
+        "context": context,
+        "retrieve": retrieved - start,
+        "extract": extracted - retrieved,
+        "llm_calls": llm_calls,
+    }
+
+
+async def run_pipeline(query: str, mode: str = RETRIEVAL_MODE, max_concurrency: int = SUBQUESTION_CONCURRENCY) -> dict:
+    """
+    Answers ``query`` and returns the answer, retrieved contexts, the files
+    they came from (sources), timings and LLM call count.
+    """
+    sources = set()
+    timings = {}
+    start = time.perf_counter()
+    subquestions = await planner_agent.run(query)
+    timings["planner"] = time.perf_counter() - start
+    print("Subquestions:")
+    print(subquestions.output.model_dump_json(indent=2))
+
+    # Subquestions are independent, so they are retrieved and extracted
+    # concurrently; gather keeps the results in the planner's order
+    semaphore = asyncio.Semaphore(max_concurrency)
+    fan_out_start = time.perf_counter()
+    results = await asyncio.gather(*[
+        process_subquestion(index, subquestion, semaphore, mode, sources)
+        for index, subquestion in enumerate(subquestions.output.subquestions, 1)
+    ])
+    timings["subquestions"] = time.perf_counter() - fan_out_start
+    contexts = [result["context"] for result in results]
+
+    final_input = FinaliserInput(
+        query=query,
+        extracted_info=contexts
     )
-    extracted_info = extractor_agent.run_sync(subquestion, deps=prompt_for_extractor)
-    print(f"Extracted Information for '{subquestion}': {extracted_info.output}")
-
-    contexts.append(retrieved_context.output)
-
-final_input = FinaliserInput(
-    query=query,
-    extracted_info=contexts
-)
-final_result = finaliser_agent.run_sync(query, deps=final_input)
-print("Final Result:")
-print(final_result.output)
-
-
-
+    finaliser_start = time.perf_counter()
+    final_result = await finaliser_agent.run(query, deps=final_input)
+    timings["finaliser"] = time.perf_counter() - finaliser_start
+    timings["total"] = time.perf_counter() - start
+
+    print(f"Timings ({mode} retrieval):")
+    print(f"  planner        {timings['planner']:6.2f}s")
+    for index, result in enumerate(results, 1):
+        print(
+            f"  subquestion {index:<2} {result['retrieve'] + result['extract']:6.2f}s "
+            f"(retrieve {result['retrieve']:.2f}s, extract {result['extract']:.2f}s)"
+        )
+    sequential = sum(result["retrieve"] + result["extract"] for result in results)
+    print(
+        f"  fan-out        {timings['subquestions']:6.2f}s "
+        f"({sequential:.2f}s if run one after another)"
+    )
+    print(f"  finaliser      {timings['finaliser']:6.2f}s")
+    print(f"  total          {timings['total']:6.2f}s")
+
+    return {
+        "answer": final_result.output,
+        "contexts": contexts,
+        "sources": sources,
+        "timings": timings,
+        "llm_calls": (
+            subquestions.usage().requests
+            + sum(result["llm_calls"] for result in results)
+            + final_result.usage().requests
+        ),
+    }
+
+
+async def answer(query: str, mode: str = RETRIEVAL_MODE, max_concurrency: int = SUBQUESTION_CONCURRENCY) -> str:
+    # Rephrasings of an earlier query skip the whole agent chain
+    cached = await aget_cached_answer(query)
+    if cached is not None:
+        print("Final Result (from the semantic cache):")
+        return cached
+
+    result = await run_pipeline(query, mode, max_concurrency)
+    print("Final Result:")
+    await acache_answer(query, result["answer"], result["sources"])
+    return result["answer"]
+
+
+if __name__ == "__main__":
+    ### Example Usage
+
+    query = "Who has more powerful normal type attack - Charizard or Pikachu?"
+    # query = "Name the p okemons that learn the moves thunderbolt or growl."
+
+    print(asyncio.run(answer(query)))
+    print(f"Query embedding cache: {get_retrieval_context().embedding_cache.stats()}")
+    print(f"Answer cache: {get_answer_cache().stats()}")
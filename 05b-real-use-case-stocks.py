@@ -4,7 +4,7 @@ from pydantic_ai import Agent
 from pydantic_ai.models.openai import OpenAIModel, OpenAIModelSettings
 from rich.console import Console
 from rich.prompt import Prompt
-from src.yahoo_finance import YahooFinance
+from src.yahoo_finance import AsyncYahooFinance
 
 import logfire
 
@@ -38,6 +38,7 @@ system_prompt = """
 ### **Step 4: Market Trends & Stock Performance**
 - Analyze recent stock performance, including price trends and trading volume.
 - Compare the stock’s performance to industry benchmarks (e.g., S&P 500, Nasdaq, sector indices).
+  Fetch the stock, its competitors and the benchmarks (e.g., ^GSPC, ^IXIC) in a single batch call.
 - Identify any major news or events that have influenced the stock price (e.g., earnings surprises, new product launches, regulatory approvals, acquisitions).
 
 ### **Step 5: Investment Recommendation (Buy, Sell, or Hold)**
@@ -86,15 +87,17 @@ agent = Agent(
     model_settings=model_settings,
     system_prompt=system_prompt,
     tools=[
-        YahooFinance.get_current_price,
-        YahooFinance.get_company_info,
-        YahooFinance.get_historical_stock_prices,
-        YahooFinance.get_stock_fundamentals,
-        YahooFinance.get_income_statements,
-        YahooFinance.get_key_financial_ratios,
-        YahooFinance.get_analyst_recommendations,
-        YahooFinance.get_company_news,
-        YahooFinance.get_technical_indicators,
+        AsyncYahooFinance.get_current_price,
+        AsyncYahooFinance.get_company_info,
+        AsyncYahooFinance.get_historical_stock_prices,
+        AsyncYahooFinance.get_stock_fundamentals,
+        AsyncYahooFinance.get_income_statements,
+        AsyncYahooFinance.get_key_financial_ratios,
+        AsyncYahooFinance.get_analyst_recommendations,
+        AsyncYahooFinance.get_company_news,
+        AsyncYahooFinance.get_technical_indicators,
+        AsyncYahooFinance.get_historical_stock_prices_batch,
+        AsyncYahooFinance.get_stock_fundamentals_batch,
         save_report_as_file
     ]
 )
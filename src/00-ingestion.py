@@ -1,58 +1,428 @@
+import argparse
+import hashlib
 import os
+import tempfile
+import time
+from datetime import datetime, timezone
 
 import lancedb
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
 
-from utils import read_files_as_object_array, recursive_text_splitter
+from utils import (
+    EMBEDDER_METADATA_KEY,
+    LANCEDB_URI,
+    TABLE_NAME,
+    ConcurrentEmbedder,
+    SimulatedEmbeddings,
+    configured_embedder_spec,
+    corpus_catalog_path,
+    create_embeddings_client,
+    CHUNKING_STRATEGIES,
+    iter_files_as_objects,
+    iter_split_files,
+    table_embedder_spec,
+    write_corpus_catalog,
+)
 
 # Load environment variables
 load_dotenv()
 
-# Create an openai client
-embeddings_model = os.getenv("EMBEDDINGS_MODEL", "")
-embeddings_client = OpenAIEmbeddings(model=embeddings_model)
+# Product quantization needs 256 rows to train its codebooks
+MIN_ROWS_FOR_VECTOR_INDEX = 256
+
+
+def build_embeddings_client(args, spec):
+    concurrent = args.concurrency > 1 or args.tokens_per_minute
+    if args.simulated_latency is not None:
+        client = SimulatedEmbeddings(latency=args.simulated_latency)
+    elif concurrent and spec.startswith("openai:"):
+        # Retries on 429 are handled by the worker pool with backoff
+        client = create_embeddings_client(spec, max_retries=0)
+    else:
+        client = create_embeddings_client(spec)
+
+    if concurrent:
+        return ConcurrentEmbedder(
+            client,
+            max_concurrency=args.concurrency,
+            tokens_per_minute=args.tokens_per_minute,
+        )
+    return client
+
+
+def chunk_id(filename, content):
+    """Content hash identifying a chunk; unchanged chunks keep their id across runs."""
+    return hashlib.sha256(f"{filename}\n{content}".encode("utf-8")).hexdigest()
+
+
+def existing_chunk_ids(tbl):
+    """Returns the ids of every chunk currently in the table."""
+    rows = tbl.search().select(["chunk_id"]).limit(None).to_arrow()
+    return set(rows.column("chunk_id").to_pylist())
+
+
+def iter_new_chunks(directory_path, existing, seen, stats, catalog, workers=1, **split_kwargs):
+    """
+    Streams (chunk_id, content, metadata) for chunks that are not in the table yet.
+
+    Files are read one at a time and cleaned and split by ``split_file``,
+    across ``workers`` processes if more than one. The id of every chunk, new
+    or not, is added to ``seen`` so deleted chunks can be found once the
+    stream ends, and every file gets an entry in ``catalog``.
+    """
+    files = iter_files_as_objects(directory_path)
+    for file, file_stats, chunks in iter_split_files(files, workers, **split_kwargs):
+        stats["files"] += 1
+        stats["raw_chars"] += file_stats["raw_chars"]
+        stats["clean_chars"] += file_stats["clean_chars"]
+        entry = catalog[file["filename"]] = {
+            "size": file_stats["size"],
+            "sha256": file_stats["sha256"],
+            "chunks": 0,
+        }
+
+        for content, metadata in chunks:
+            cid = chunk_id(metadata["filename"], content)
+            if cid in seen:
+                continue  # Exact duplicate of an earlier chunk
+
+            seen.add(cid)
+            stats["chunks"] += 1
+            stats["chunk_chars"] += len(content)
+            entry["chunks"] += 1
+            if cid in existing:
+                stats["skipped"] += 1
+                continue
+
+            yield cid, content, metadata
+
+
+def has_vector_index(tbl):
+    return any(
+        "vector" in index.columns and index.index_type != "FTS"
+        for index in tbl.list_indices()
+    )
+
+
+def create_vector_index(tbl, args):
+    num_rows = tbl.count_rows()
+    if num_rows < MIN_ROWS_FOR_VECTOR_INDEX:
+        print(
+            f"Skipping {args.vector_index} index: {num_rows} rows is too few to "
+            "train it, and an exact scan is fast at this size"
+        )
+        return
+
+    print(f"Building {args.vector_index} vector index over {num_rows} rows...")
+    start = time.perf_counter()
+    tbl.create_index(
+        metric="l2",
+        vector_column_name="vector",
+        index_type=args.vector_index.upper(),
+        num_partitions=args.num_partitions,
+        num_sub_vectors=args.num_sub_vectors,
+        replace=True,
+    )
+    print(f"Built vector index in {time.perf_counter() - start:.1f}s")
+
+
+def has_index_on(tbl, column):
+    return any(index.columns == [column] for index in tbl.list_indices())
+
+
+def iter_batches(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
 
 def main():
-    # Read the files
-    print("Reading files...")
-    object_array = read_files_as_object_array("./data")
-
-    # Split the markdown files into chunks
-    splits = recursive_text_splitter(object_array, 3000, 100)
-
-    # Prepare an array of string from the documents
-    splits_as_string = [
-        f"{doc.metadata.get('filename', '')}\n{doc.page_content}\n" for doc in splits
-    ]
-
-    # Compute the embeddings
-    print("Computing embeddings...")
-    embeddings = embeddings_client.embed_documents(splits_as_string, chunk_size=512)
-
-    # Save the embeddings to libsql
-    print("Saving embeddings to database...")
-    uri = "data/sample-lancedb"
-    db = lancedb.connect(uri)
-    if "pokemon_moves" in db.table_names():
-        db.drop_table("pokemon_moves")  # Drop the table if it exists
-
-    # Insert the embeddings into the database
-    data = []
-    for i, embedding in enumerate(embeddings):
-        data.append(
+    parser = argparse.ArgumentParser(description="Ingest ./data into lancedb")
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Drop the table and re-embed every chunk instead of ingesting incrementally",
+    )
+    parser.add_argument(
+        "--no-clean",
+        action="store_true",
+        help="Keep scraped pages as-is instead of stripping script, style and "
+        "navigation boilerplate",
+    )
+    parser.add_argument(
+        "--chunking",
+        choices=list(CHUNKING_STRATEGIES),
+        default="recursive",
+        help="How files are split: by characters, by markdown headers, or by tokens",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Maximum chunk size in characters (tokens for --chunking tokens); "
+        "defaults to 3000 characters or 750 tokens",
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=int,
+        default=None,
+        help="Overlap between consecutive chunks (default 100 characters or 25 tokens)",
+    )
+    parser.add_argument(
+        "--split-workers",
+        type=int,
+        default=1,
+        help="Number of processes cleaning and splitting files",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=512,
+        help="Number of chunks embedded and written to lancedb at a time",
+    )
+    parser.add_argument(
+        "--request-size",
+        type=int,
+        default=None,
+        help="Number of chunks sent in one embeddings request "
+        "(default: the batch split evenly over --concurrency requests)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Maximum number of embeddings requests in flight",
+    )
+    parser.add_argument(
+        "--tokens-per-minute",
+        type=int,
+        default=None,
+        help="Client side cap on tokens sent to the embeddings API per minute",
+    )
+    parser.add_argument(
+        "--simulated-latency",
+        type=float,
+        default=None,
+        help="Use a local stand-in that sleeps this many seconds per request "
+        "instead of the embeddings API, to benchmark offline",
+    )
+    parser.add_argument(
+        "--uri",
+        default=None,
+        help=f"lancedb directory to write to (default {LANCEDB_URI}, or a scratch "
+        "directory in the temp dir with --simulated-latency)",
+    )
+    parser.add_argument(
+        "--vector-index",
+        choices=["none", "ivf_pq", "ivf_hnsw_sq", "ivf_hnsw_pq"],
+        default="none",
+        help="ANN index to build on the vector column; by default searches are exact scans",
+    )
+    parser.add_argument(
+        "--filename-index",
+        choices=["bitmap", "btree", "none"],
+        default="bitmap",
+        help="Scalar index on the filename column; bitmap suits a few thousand "
+        "distinct files, btree many more",
+    )
+    parser.add_argument(
+        "--num-partitions",
+        type=int,
+        default=None,
+        help="IVF partitions of the vector index (lancedb default: sqrt of the row count)",
+    )
+    parser.add_argument(
+        "--num-sub-vectors",
+        type=int,
+        default=None,
+        help="PQ sub-vectors of the vector index (lancedb default: dimension / 16)",
+    )
+    args = parser.parse_args()
+    # Resolved here so the catalog records what was used; 0 is a valid overlap
+    _, default_size, default_overlap = CHUNKING_STRATEGIES[args.chunking]
+    if args.chunk_size is None:
+        args.chunk_size = default_size
+    if args.chunk_overlap is None:
+        args.chunk_overlap = default_overlap
+    if args.request_size is None:
+        # Batches are embedded one after another, so each one has to be split
+        # into enough requests to keep every worker busy
+        args.request_size = max(1, -(-args.batch_size // args.concurrency))
+    if args.uri is None:
+        # Simulated vectors must never replace a real table
+        args.uri = (
+            os.path.join(tempfile.gettempdir(), "simulated-lancedb")
+            if args.simulated_latency is not None
+            else LANCEDB_URI
+        )
+
+    if args.simulated_latency is not None:
+        # Simulated vectors are only meaningful to the simulated query embedder
+        embedder = "simulated:1536"
+    else:
+        embedder = configured_embedder_spec()
+    embeddings_client = build_embeddings_client(args, embedder)
+    print(f"Embedding with {embedder} into {args.uri}")
+
+    db = lancedb.connect(args.uri)
+    tbl = None
+    if TABLE_NAME in db.table_names():
+        tbl = db.open_table(TABLE_NAME)
+        recorded_embedder = table_embedder_spec(tbl.schema)
+        # Tables written before chunk ids existed can't be diffed, and vectors
+        # from another embedder can't be mixed with new ones
+        if (
+            args.rebuild
+            or "chunk_id" not in tbl.schema.names
+            or recorded_embedder not in (None, embedder)
+        ):
+            if args.simulated_latency is not None and recorded_embedder not in (None, embedder):
+                parser.error(
+                    f"{args.uri} holds a table embedded with {recorded_embedder}; "
+                    "simulated runs won't replace it, pass a scratch --uri"
+                )
+            print("Dropping existing table for a full rebuild...")
+            db.drop_table(TABLE_NAME)
+            tbl = None
+        elif "filename" not in tbl.schema.names:
+            # Promote the nested filename to a column of its own, which can
+            # be indexed, without re-embedding anything
+            tbl.add_columns({"filename": "metadata.filename"})
+    created = tbl is None
+
+    # Only chunk ids are held for the whole run; contents and vectors are
+    # streamed through in batches so memory stays flat as the corpus grows.
+    existing = existing_chunk_ids(tbl) if tbl is not None else set()
+    seen = set()
+    catalog = {}
+    stats = {
+        "files": 0,
+        "raw_chars": 0,
+        "clean_chars": 0,
+        "chunks": 0,
+        "chunk_chars": 0,
+        "skipped": 0,
+        "embedded": 0,
+    }
+
+    print("Reading, splitting and embedding files...")
+    start = time.perf_counter()
+    chunks = iter_new_chunks(
+        "./data",
+        existing,
+        seen,
+        stats,
+        catalog,
+        workers=args.split_workers,
+        strategy=args.chunking,
+        chunk_size=args.chunk_size,
+        overlap_size=args.chunk_overlap,
+        clean=not args.no_clean,
+    )
+    for batch in iter_batches(chunks, args.batch_size):
+        splits_as_string = [
+            f"{metadata.get('filename', '')}\n{content}\n"
+            for _, content, metadata in batch
+        ]
+        embeddings = embeddings_client.embed_documents(
+            splits_as_string, chunk_size=args.request_size
+        )
+
+        data = [
             {
+                "chunk_id": cid,
+                "filename": metadata["filename"],
                 "vector": embedding,
-                "content": splits[i].page_content,
-                "metadata": splits[i].metadata,
+                "content": content,
+                "metadata": metadata,
             }
+            for (cid, content, metadata), embedding in zip(batch, embeddings)
+        ]
+        if tbl is None:
+            tbl = db.create_table(TABLE_NAME, data=data)
+        else:
+            (
+                tbl.merge_insert("chunk_id")
+                .when_matched_update_all()
+                .when_not_matched_insert_all()
+                .execute(data)
+            )
+
+        stats["embedded"] += len(data)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {stats['files']} files, {stats['chunks']} chunks read, "
+            f"{stats['embedded']} embedded ({stats['embedded'] / elapsed:.1f} chunks/s)"
+        )
+
+    stale_ids = list(existing - seen)
+    for start_index in range(0, len(stale_ids), 1000):
+        batch = ", ".join(f"'{cid}'" for cid in stale_ids[start_index : start_index + 1000])
+        tbl.delete(f"chunk_id IN ({batch})")
+
+    elapsed = time.perf_counter() - start
+    if not args.no_clean and stats["raw_chars"]:
+        print(
+            f"Cleaning reduced {stats['raw_chars']} to {stats['clean_chars']} characters "
+            f"({1 - stats['clean_chars'] / stats['raw_chars']:.0%} smaller)"
+        )
+    if stats["chunks"]:
+        print(
+            f"Chunked with {args.chunking}: {stats['chunks']} chunks of "
+            f"{stats['chunk_chars'] / stats['chunks']:.0f} characters on average"
         )
+    print(
+        f"{stats['chunks']} chunks in {stats['files']} files: "
+        f"{stats['skipped']} unchanged (skipped), {stats['embedded']} new or changed, "
+        f"{len(stale_ids)} deleted in {elapsed:.1f}s"
+    )
+
+    if tbl is None:
+        print("Nothing to ingest")
+        return
+
+    # Record the embedder so queries are embedded with the matching one
+    if table_embedder_spec(tbl.schema) != embedder:
+        tbl.replace_field_metadata("vector", {EMBEDDER_METADATA_KEY: embedder})
+
+    if not created and (stats["embedded"] or stale_ids):
+        # Fold the new rows into the existing indices and compact the deletes
+        tbl.optimize()
+
+    # Indices are built when missing: on a new table, or once every row they
+    # covered has been replaced, which drops them
+    if not has_index_on(tbl, "content"):
+        # Create the full text search index
+        tbl.create_fts_index("content", use_tantivy=False)
+    if args.filename_index != "none" and not has_index_on(tbl, "filename"):
+        # Scalar index that speeds up filtering on the filename column
+        print(f"Building {args.filename_index} index on filename...")
+        tbl.create_scalar_index("filename", index_type=args.filename_index.upper())
+
+    if args.vector_index != "none" and (created or not has_vector_index(tbl)):
+        create_vector_index(tbl, args)
 
-    # Create the table and full text search index
-    tbl = db.create_table("pokemon_moves", data=data)
-    tbl.create_fts_index("content", use_tantivy=False)
+    # Lets the agents list the corpus without reading it
+    write_corpus_catalog(
+        {
+            "embedder": embedder,
+            "chunking": {
+                "strategy": args.chunking,
+                "chunk_size": args.chunk_size,
+                "chunk_overlap": args.chunk_overlap,
+            },
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+            "files": catalog,
+        },
+        corpus_catalog_path(args.uri),
+    )
+    print(f"Wrote corpus catalog to {corpus_catalog_path(args.uri)}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
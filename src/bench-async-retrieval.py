@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import time
+
+from dotenv import load_dotenv
+
+from utils import (
+    EmbeddingCache,
+    SimulatedEmbeddings,
+    aperform_hybrid_search,
+    get_retrieval_context,
+    perform_hybrid_search,
+)
+
+# Load environment variables
+load_dotenv()
+
+QUERIES = [
+    "electric type moves",
+    "moves with the highest power",
+    "moves learnt by TM",
+    "egg moves",
+    "status moves that lower attack",
+    "fire type special attacks",
+    "moves learnt by level up",
+    "psychic moves",
+]
+
+
+def run_sync(queries):
+    for query in queries:
+        perform_hybrid_search(query)
+
+
+async def run_async(queries):
+    await asyncio.gather(*[aperform_hybrid_search(query) for query in queries])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Throughput of sync vs async retrieval under N concurrent queries"
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument(
+        "--simulated-latency",
+        type=float,
+        default=None,
+        help="Replace the embeddings client with a local stand-in that sleeps "
+        "this many seconds per call, so the benchmark runs offline",
+    )
+    args = parser.parse_args()
+
+    ctx = get_retrieval_context()
+    # Every query must pay for its embedding, otherwise we measure the cache
+    ctx.embedding_cache = EmbeddingCache(max_size=0)
+    if args.simulated_latency is not None:
+        dimensions = len(ctx.table.head(1)["vector"][0])
+        ctx.embedding_client = SimulatedEmbeddings(dimensions, args.simulated_latency)
+
+    # Warm up both code paths
+    run_sync(QUERIES[:1])
+    asyncio.run(run_async(QUERIES[:1]))
+
+    print(f"{'N':>5} {'sync q/s':>10} {'async q/s':>10} {'speedup':>8}")
+    for n in args.concurrency:
+        queries = [QUERIES[i % len(QUERIES)] + f" #{i}" for i in range(n)]
+
+        start = time.perf_counter()
+        run_sync(queries)
+        sync_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(run_async(queries))
+        async_elapsed = time.perf_counter() - start
+
+        print(
+            f"{n:>5} {n / sync_elapsed:>10.1f} {n / async_elapsed:>10.1f} "
+            f"{sync_elapsed / async_elapsed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
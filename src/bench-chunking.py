@@ -0,0 +1,126 @@
+import argparse
+import statistics
+import tempfile
+import time
+
+import lancedb
+from dotenv import load_dotenv
+
+from utils import (
+    CHUNKING_STRATEGIES,
+    EMBEDDER_METADATA_KEY,
+    RetrievalContext,
+    build_context_from_results,
+    configured_embedder_spec,
+    create_embeddings_client,
+    estimate_tokens,
+    iter_split_files,
+    perform_hybrid_search,
+    read_files_as_object_array,
+    set_retrieval_context,
+)
+
+# Load environment variables
+load_dotenv()
+
+# (query, file to search, move the retrieved chunks have to contain)
+QUERIES = [
+    ("electric type moves", "pikachu.md", "Thunderbolt"),
+    ("special fire type moves", "charizard.md", "Flamethrower"),
+    ("moves learnt by level up", "charizard.md", "Ember"),
+    ("psychic type moves", "mewtwo.md", "Psychic"),
+    ("status moves learnt by level up", "slowpoke.md", "Amnesia"),
+    ("egg moves", "pichu.md", "Wish"),
+    ("special moves from breeding", "pichu.md", "Volt Tackle"),
+    ("electric moves learnt by TM", "raichu.md", "Thunderbolt"),
+]
+
+
+def split_corpus(files, strategy, workers):
+    start = time.perf_counter()
+    chunks = [
+        (content, metadata)
+        for _, _, file_chunks in iter_split_files(files, workers, strategy=strategy)
+        for content, metadata in file_chunks
+    ]
+    return chunks, time.perf_counter() - start
+
+
+def build_table(uri, chunks, embedder):
+    client = create_embeddings_client(embedder)
+    vectors = client.embed_documents(
+        [f"{metadata['filename']}\n{content}\n" for content, metadata in chunks]
+    )
+    tbl = lancedb.connect(uri).create_table(
+        "chunks",
+        data=[
+            {"vector": vector, "content": content, "metadata": metadata}
+            for (content, metadata), vector in zip(chunks, vectors)
+        ],
+    )
+    tbl.replace_field_metadata("vector", {EMBEDDER_METADATA_KEY: embedder})
+    tbl.create_fts_index("content", use_tantivy=False)
+
+
+def evaluate(top_k):
+    """Hit rate and mean reciprocal rank of the expected move, plus context size."""
+    hits, reciprocal_ranks, context_tokens = [], [], []
+    for query, pokemon, expected in QUERIES:
+        results = perform_hybrid_search(query, pokemon=pokemon, top_k=top_k)
+        rank = next(
+            (i for i, result in enumerate(results, 1) if expected in result["content"]),
+            None,
+        )
+        hits.append(rank is not None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+        context_tokens.append(estimate_tokens(build_context_from_results(results)))
+    return {
+        "hit_rate": statistics.mean(hits),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "context_tokens": statistics.mean(context_tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Chunk count, chunk size and retrieval quality of each chunking strategy"
+    )
+    parser.add_argument("--strategies", nargs="+", default=list(CHUNKING_STRATEGIES))
+    parser.add_argument("--data", default="./data")
+    parser.add_argument(
+        "--embedder",
+        default=None,
+        help='Embedder spec such as "hashing:384" (default: EMBEDDINGS_PROVIDER/EMBEDDINGS_MODEL)',
+    )
+    parser.add_argument("--split-workers", type=int, default=1)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    embedder = args.embedder or configured_embedder_spec()
+    files = read_files_as_object_array(args.data)
+    print(f"{len(files)} files, embedding with {embedder}, top_k={args.top_k}")
+    print(
+        f"{'strategy':<10} {'chunks':>7} {'avg chars':>10} {'avg tokens':>11} "
+        f"{'split s':>8} {'hit rate':>9} {'MRR':>6} {'ctx tokens':>11}"
+    )
+
+    for strategy in args.strategies:
+        chunks, split_seconds = split_corpus(files, strategy, args.split_workers)
+        sizes = [len(content) for content, _ in chunks]
+        tokens = [estimate_tokens(content) for content, _ in chunks]
+
+        with tempfile.TemporaryDirectory() as uri:
+            build_table(uri, chunks, embedder)
+            set_retrieval_context(RetrievalContext(uri=uri, table_name="chunks"))
+            quality = evaluate(args.top_k)
+
+        print(
+            f"{strategy:<10} {len(chunks):>7} {statistics.mean(sizes):>10.0f} "
+            f"{statistics.mean(tokens):>11.0f} {split_seconds:>8.2f} "
+            f"{quality['hit_rate']:>9.0%} {quality['mrr']:>6.2f} "
+            f"{quality['context_tokens']:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
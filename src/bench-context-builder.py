@@ -0,0 +1,71 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from utils import (
+    build_context_from_results,
+    estimate_tokens,
+    perform_fts_search,
+    perform_hybrid_search,
+    perform_vector_search,
+)
+
+# Load environment variables
+load_dotenv()
+
+QUESTIONS = [
+    ("electric type moves", "pikachu.md"),
+    ("moves learnt by TM", "charizard.md"),
+    ("egg moves", "pichu.md"),
+    ("psychic moves", "mewtwo.md"),
+    ("moves learnt by level up", "raichu.md"),
+    ("status moves", "slowpoke.md"),
+]
+
+
+def naive_context(results):
+    """The context builder before deduplication and budgeting, for comparison."""
+    return "---\n".join(
+        [
+            f"Title: {result['metadata']['filename']}\nContent:\n{result['content']}\n"
+            for result in results
+        ]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Prompt tokens of the naive vs deduplicating, budgeted context builder"
+    )
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--token-budget", type=int, default=4000)
+    args = parser.parse_args()
+
+    print(f"{'query':<28} {'mode':<16} {'naive':>8} {'built':>8} {'saved':>7}")
+    totals = [0, 0]
+    for query, pokemon in QUESTIONS:
+        vector_results = perform_vector_search(query, pokemon=pokemon, top_k=args.top_k)
+        fts_results = perform_fts_search(query, pokemon=pokemon, top_k=args.top_k)
+        hybrid_results = perform_hybrid_search(query, pokemon=pokemon, top_k=args.top_k)
+
+        # The agents used to call both search tools, sending both contexts
+        for mode, results in (
+            ("vector + keyword", vector_results + fts_results),
+            ("hybrid", hybrid_results),
+        ):
+            naive = estimate_tokens(naive_context(results))
+            built = estimate_tokens(
+                build_context_from_results(results, token_budget=args.token_budget)
+            )
+            totals[0] += naive
+            totals[1] += built
+            print(
+                f"{query:<28} {mode:<16} {naive:>8} {built:>8} {1 - built / naive:>7.0%}"
+            )
+
+    print(f"{'total':<45} {totals[0]:>8} {totals[1]:>8} {1 - totals[1] / totals[0]:>7.0%}")
+    print("Tokens are estimated at four characters per token.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+
+from utils import (
+    ConcurrentEmbedder,
+    SimulatedEmbeddings,
+    read_files_as_object_array,
+    recursive_text_splitter,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Offline embedding throughput: sequential vs concurrent workers"
+    )
+    parser.add_argument("--chunks", type=int, default=2048)
+    parser.add_argument("--request-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--latency-per-text", type=float, default=0.002)
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument("--tokens-per-minute", type=int, default=None)
+    args = parser.parse_args()
+
+    # Repeat the real chunks until we have enough text to embed
+    splits = recursive_text_splitter(read_files_as_object_array("./data"), 3000, 100)
+    texts = [
+        f"{splits[i % len(splits)].page_content} #{i}" for i in range(args.chunks)
+    ]
+
+    client = SimulatedEmbeddings(
+        latency=args.latency,
+        latency_per_text=args.latency_per_text,
+        rate_limit_probability=args.rate_limit_probability,
+    )
+
+    print(f"{len(texts)} chunks, {args.request_size} per request")
+    if args.rate_limit_probability == 0:
+        start = time.perf_counter()
+        for i in range(0, len(texts), args.request_size):
+            client.embed_documents(texts[i : i + args.request_size])
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential':<16} {len(texts) / elapsed:>10.1f} chunks/s")
+
+    for concurrency in args.concurrency:
+        embedder = ConcurrentEmbedder(
+            client,
+            max_concurrency=concurrency,
+            tokens_per_minute=args.tokens_per_minute,
+            backoff_base=0.1,
+        )
+        start = time.perf_counter()
+        embeddings = embedder.embed_documents(texts, chunk_size=args.request_size)
+        elapsed = time.perf_counter() - start
+        assert len(embeddings) == len(texts)
+        print(
+            f"{f'{concurrency} workers':<16} {len(texts) / elapsed:>10.1f} chunks/s"
+            f"   {embedder.retries} retries"
+        )
+
+
+if __name__ == "__main__":
+    main()
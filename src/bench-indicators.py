@@ -0,0 +1,128 @@
+import argparse
+import statistics
+import time
+
+import numpy as np
+import pandas as pd
+
+from yahoo_finance import compute_indicators
+
+
+def synthetic_prices(symbols: int, days: int, seed: int = 0) -> dict:
+    """Daily OHLCV of ``symbols`` random walks, as DataFrames with one column per symbol."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end="2025-01-01", periods=days)
+    columns = [f"SYM{i}" for i in range(symbols)]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, symbols)), axis=0))
+    spread = close * rng.uniform(0.005, 0.03, (days, symbols))
+    return {
+        name: pd.DataFrame(values, index=index, columns=columns)
+        for name, values in {
+            "close": close,
+            "high": close + spread,
+            "low": close - spread,
+            "volume": rng.integers(1_000_000, 50_000_000, (days, symbols)).astype(float),
+        }.items()
+    }
+
+
+def reference_indicators(close: list[float]) -> dict:
+    """SMA_20, EMA_20 and RSI_14 with plain Python loops, to check and time against."""
+    sma, ema, rsi = [], [], []
+    window_sum, average, gain, loss = 0.0, None, 0.0, 0.0
+    for i, price in enumerate(close):
+        window_sum += price - (close[i - 20] if i >= 20 else 0.0)
+        sma.append(window_sum / 20 if i >= 19 else float("nan"))
+
+        average = price if average is None else average + 2 / 21 * (price - average)
+        ema.append(average if i >= 19 else float("nan"))
+
+        if i == 0:
+            rsi.append(float("nan"))
+            continue
+        change = close[i] - close[i - 1]
+        if i == 1:
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+        else:
+            gain += (max(change, 0.0) - gain) / 14
+            loss += (max(-change, 0.0) - loss) / 14
+        rsi.append(100 - 100 / (1 + gain / loss) if i >= 14 and loss else float("nan"))
+    return {"SMA_20": sma, "EMA_20": ema, "RSI_14": rsi}
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the vectorised indicator engine on multi-year daily series"
+    )
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--reference-symbols",
+        type=int,
+        default=20,
+        help="Symbols to run through the plain Python reference (it is slow)",
+    )
+    args = parser.parse_args()
+
+    prices = synthetic_prices(args.symbols, args.years * 252)
+    columns = list(prices["close"].columns)
+    print(f"{args.symbols} symbols x {len(prices['close'])} days")
+
+    wide, wide_seconds = timed(lambda: compute_indicators(**prices), args.repeat)
+    per_symbol, per_symbol_seconds = timed(
+        lambda: {
+            symbol: compute_indicators(**{name: frame[symbol] for name, frame in prices.items()})
+            for symbol in columns
+        },
+        args.repeat,
+    )
+
+    reference_columns = columns[: args.reference_symbols]
+    reference, reference_seconds = timed(
+        lambda: {
+            symbol: reference_indicators(prices["close"][symbol].tolist())
+            for symbol in reference_columns
+        },
+        1,
+    )
+
+    # Both vectorised paths and the loops have to agree
+    wide_error = max(
+        float((wide[name][symbol] - per_symbol[symbol][name]).abs().max())
+        for symbol in columns
+        for name in wide
+    )
+    reference_error = max(
+        float(np.nanmax(np.abs(wide[name][symbol].to_numpy() - np.array(values))))
+        for symbol in reference_columns
+        for name, values in reference[symbol].items()
+    )
+
+    print(f"{'mode':<26} {'total s':>9} {'ms/symbol':>10} {'us/symbol/indicator':>20}")
+    for name, seconds, symbols, indicators in [
+        ("all symbols at once", wide_seconds, len(columns), len(wide)),
+        ("one symbol at a time", per_symbol_seconds, len(columns), len(wide)),
+        ("python loops", reference_seconds, len(reference_columns), 3),
+    ]:
+        print(
+            f"{name:<26} {seconds:>9.3f} {seconds / symbols * 1000:>10.2f} "
+            f"{seconds / symbols / indicators * 1e6:>20.0f}"
+        )
+    print(
+        f"{len(wide)} indicators; max difference all-at-once vs per symbol {wide_error:.2e}, "
+        f"vs python loops {reference_error:.2e}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from utils import maximal_marginal_relevance, perform_vector_search
+
+# Load environment variables
+load_dotenv()
+
+QUERIES = [
+    "electric type moves",
+    "moves learnt by TM",
+    "egg moves",
+    "psychic moves",
+    "moves learnt by level up",
+    "status moves",
+]
+
+
+def median_ms(fn, iterations):
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Overhead of MMR diversification over a plain top_k vector search"
+    )
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--mmr-lambda", type=float, default=0.5)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    # The MMR stage alone, on random candidates
+    rng = np.random.default_rng(0)
+    print(f"MMR stage alone, {args.dimensions} dimensions, top_k={args.top_k}")
+    for n in (20, 50, 100, 200, 500):
+        query = rng.standard_normal(args.dimensions)
+        candidates = rng.standard_normal((n, args.dimensions))
+        ms = median_ms(
+            lambda _: maximal_marginal_relevance(
+                query, candidates, args.top_k, lambda_mult=args.mmr_lambda
+            ),
+            args.iterations,
+        )
+        print(f"  {n:>4} candidates  {ms:8.3f} ms")
+
+    # End to end against the pokemon_moves table; query embeddings are
+    # cached after the warm-up so only retrieval is compared
+    for query in QUERIES:
+        perform_vector_search(query, top_k=args.top_k)
+
+    def plain(i):
+        perform_vector_search(QUERIES[i % len(QUERIES)], top_k=args.top_k)
+
+    def mmr(i):
+        perform_vector_search(
+            QUERIES[i % len(QUERIES)],
+            top_k=args.top_k,
+            mmr_lambda=args.mmr_lambda,
+            fetch_k=args.fetch_k,
+        )
+
+    plain_ms = median_ms(plain, args.iterations)
+    mmr_ms = median_ms(mmr, args.iterations)
+    print("perform_vector_search, median latency")
+    print(f"  plain top_k={args.top_k:<14} {plain_ms:8.3f} ms")
+    print(f"  mmr fetch_k={args.fetch_k:<13} {mmr_ms:8.3f} ms  (+{mmr_ms - plain_ms:.3f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import os
+import statistics
+import time
+
+import lancedb
+from dotenv import load_dotenv
+from langchain_openai import OpenAIEmbeddings
+
+from utils import LANCEDB_URI, TABLE_NAME, RetrievalContext
+
+# Load environment variables
+load_dotenv()
+
+ITERATIONS = 50
+QUERY = "thunderbolt"
+POKEMON = "pikachu.md"
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p50 = timings[len(timings) // 2] * 1000
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000
+    mean = statistics.mean(timings) * 1000
+    print(f"{name:<40} mean {mean:8.2f} ms   p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+
+
+def time_calls(fn):
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    # The query vector is computed once so the network round trip of the
+    # embedding call does not hide the setup cost we are measuring.
+    query_vector = lancedb.connect(LANCEDB_URI).open_table(TABLE_NAME).head(1)[
+        "vector"
+    ][0].as_py()
+
+    def uncached_client():
+        OpenAIEmbeddings(model=os.getenv("EMBEDDINGS_MODEL", ""))
+
+    def uncached_vector():
+        uncached_client()
+        tbl = lancedb.connect(LANCEDB_URI).open_table(TABLE_NAME)
+        tbl.search(query_vector).limit(5).select(["content", "metadata"]).where(
+            f"metadata.filename = '{POKEMON}'"
+        ).to_list()
+
+    def uncached_fts():
+        tbl = lancedb.connect(LANCEDB_URI).open_table(TABLE_NAME)
+        tbl.search(QUERY, query_type="fts").limit(5).select(
+            ["content", "metadata"]
+        ).where(f"metadata.filename = '{POKEMON}'", prefilter=True).to_list()
+
+    ctx = RetrievalContext()
+
+    def shared_vector():
+        ctx.embedding_client
+        ctx.table.search(query_vector).limit(5).select(["content", "metadata"]).where(
+            f"metadata.filename = '{POKEMON}'"
+        ).to_list()
+
+    def shared_fts():
+        ctx.table.search(QUERY, query_type="fts").limit(5).select(
+            ["content", "metadata"]
+        ).where(f"metadata.filename = '{POKEMON}'", prefilter=True).to_list()
+
+    # Warm up the OS page cache and the shared context
+    uncached_vector()
+    shared_vector()
+    shared_fts()
+
+    print(f"Per-call latency over {ITERATIONS} calls (embedding round trip excluded)")
+    report("embeddings client construction", time_calls(uncached_client))
+    report("vector search, connect per call", time_calls(uncached_vector))
+    report("vector search, shared context", time_calls(shared_vector))
+    report("fts search, connect per call", time_calls(uncached_fts))
+    report("fts search, shared context", time_calls(shared_fts))
+
+
+if __name__ == "__main__":
+    main()
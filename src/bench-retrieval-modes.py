@@ -0,0 +1,208 @@
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+# Load environment variables
+load_dotenv()
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Questions with moves a correct answer has to mention, taken from data/
+QUESTIONS = [
+    (
+        "What are the electric-type moves of Pikachu?",
+        ["Thunderbolt", "Thunder Wave", "Thunder", "Charge"],
+    ),
+    (
+        "Which fire-type moves does Charizard learn?",
+        ["Flamethrower", "Ember"],
+    ),
+    (
+        "Which electric moves do Pichu and Raichu learn?",
+        ["ThunderShock", "Thunder Wave", "Thunderbolt"],
+    ),
+    (
+        "Which psychic moves do Mewtwo and Slowpoke both learn?",
+        ["Psychic"],
+    ),
+    (
+        "Who has more powerful normal type attack - Charizard or Pikachu?",
+        ["Charizard", "Pikachu"],
+    ),
+]
+
+
+def load_pipeline():
+    """Imports 04b-agentic-rag.py, whose name isn't a valid module name."""
+    sys.path.insert(0, ROOT)
+    spec = importlib.util.spec_from_file_location(
+        "agentic_rag", os.path.join(ROOT, "04b-agentic-rag.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def stand_in_model(latency, pokemon_names):
+    """
+    Local stand-in for the LLM behind every agent of the pipeline, waiting
+    ``latency`` seconds per call. The planner gets one subquestion per pokemon
+    named in the query, the retriever searches the pokemon its subquestion
+    names, and the extractor and finaliser repeat their context, so answer
+    coverage follows retrieval.
+    """
+
+    def named_in(text):
+        text = text.lower()
+        return sorted((name for name in pokemon_names if name in text), key=text.index)
+
+    async def respond(messages, info):
+        await asyncio.sleep(latency)
+        last = messages[-1].parts[-1]
+        if info.output_tools:
+            query = last.content
+            subquestions = [
+                {"question": f"{name}: {query}", "pokemon": name, "search_query": query}
+                for name in named_in(query)
+            ] or [{"question": query, "pokemon": None, "search_query": query}]
+            return ModelResponse(
+                parts=[ToolCallPart(info.output_tools[0].name, {"subquestions": subquestions})]
+            )
+        if info.function_tools and last.part_kind == "user-prompt":
+            return ModelResponse(
+                parts=[
+                    ToolCallPart(
+                        "perform_search",
+                        {"query": last.content, "pokemon": named_in(last.content)[:1]},
+                    )
+                ]
+            )
+        context = [
+            str(part.content)
+            for message in messages
+            for part in message.parts
+            if part.part_kind in ("system-prompt", "tool-return")
+        ]
+        return ModelResponse(parts=[TextPart("\n".join(context))])
+
+    return FunctionModel(respond)
+
+
+def coverage(text, expected):
+    text = text.lower()
+    return sum(keyword.lower() in text for keyword in expected) / len(expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end latency and answer quality of agentic vs direct retrieval in 04b"
+    )
+    parser.add_argument("--modes", nargs="+", default=["agentic", "direct"])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--verbose", action="store_true", help="Show the pipeline output")
+    parser.add_argument(
+        "--stand-in-latency",
+        type=float,
+        default=None,
+        help="Replace the LLM of every agent with a local stand-in taking this many seconds per call",
+    )
+    parser.add_argument(
+        "--output",
+        default=f"bench-results/retrieval-modes-{datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    args = parser.parse_args()
+
+    if args.stand_in_latency is not None:
+        # Runs offline, so traces are only sent when a logfire token exists
+        os.environ.setdefault("LOGFIRE_SEND_TO_LOGFIRE", "if-token-present")
+        os.environ.setdefault("LOGFIRE_CONSOLE", "false")
+
+    pipeline = load_pipeline()
+    overrides = contextlib.ExitStack()
+    if args.stand_in_latency is not None:
+        model = stand_in_model(args.stand_in_latency, pipeline.list_pokemon())
+        for agent in (
+            pipeline.planner_agent,
+            pipeline.retriever_agent,
+            pipeline.extractor_agent,
+            pipeline.finaliser_agent,
+        ):
+            overrides.enter_context(agent.override(model=model))
+
+    runs = []
+    for query, expected in QUESTIONS:
+        for mode in args.modes:
+            for _ in range(args.repeats):
+                output = sys.stdout if args.verbose else io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    result = asyncio.run(pipeline.run_pipeline(query, mode=mode))
+                runs.append(
+                    {
+                        "query": query,
+                        "mode": mode,
+                        "total_s": result["timings"]["total"],
+                        "llm_calls": result["llm_calls"],
+                        "retrieval_recall": coverage("\n".join(result["contexts"]), expected),
+                        "answer_coverage": coverage(result["answer"], expected),
+                    }
+                )
+                print(
+                    f"{mode:<8} {result['timings']['total']:6.2f}s "
+                    f"{result['llm_calls']:>3} LLM calls  {query}"
+                )
+    overrides.close()
+
+    # Retrieval recall checks the contexts handed to the extractor and
+    # finaliser; answer coverage checks what the user finally sees.
+    print(
+        f"\n{'mode':<8} {'p50 s':>7} {'mean s':>7} {'LLM calls':>10} "
+        f"{'recall':>7} {'coverage':>9}"
+    )
+    summary = {}
+    for mode in args.modes:
+        mode_runs = [run for run in runs if run["mode"] == mode]
+        totals = [run["total_s"] for run in mode_runs]
+        summary[mode] = {
+            "p50_s": statistics.median(totals),
+            "mean_s": statistics.mean(totals),
+            "llm_calls": statistics.mean(run["llm_calls"] for run in mode_runs),
+            "retrieval_recall": statistics.mean(run["retrieval_recall"] for run in mode_runs),
+            "answer_coverage": statistics.mean(run["answer_coverage"] for run in mode_runs),
+        }
+        stats = summary[mode]
+        print(
+            f"{mode:<8} {stats['p50_s']:>7.2f} {stats['mean_s']:>7.2f} "
+            f"{stats['llm_calls']:>10.1f} {stats['retrieval_recall']:>7.0%} "
+            f"{stats['answer_coverage']:>9.0%}"
+        )
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "timestamp": datetime.now().isoformat(),
+                "machine": platform.platform(),
+                "config": vars(args),
+                "summary": summary,
+                "runs": runs,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+import json
+import os
+import platform
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import lancedb
+import numpy as np
+import pyarrow as pa
+
+from utils import (
+    EmbeddingCache,
+    RetrievalContext,
+    SimulatedEmbeddings,
+    build_context_from_results,
+    perform_fts_search,
+    perform_vector_search,
+    set_retrieval_context,
+)
+
+MOVES = [
+    "Thunderbolt", "Thunder Wave", "Quick Attack", "Growl", "Tail Whip",
+    "Flamethrower", "Fire Blast", "Ember", "Dragon Claw", "Fly", "Psychic",
+    "Confusion", "Recover", "Amnesia", "Surf", "Water Gun", "Headbutt",
+    "Slam", "Body Slam", "Double Team", "Rest", "Protect", "Earthquake",
+    "Ice Beam", "Shadow Ball", "Iron Tail", "Encore", "Wish", "Charge", "Bide",
+]
+TYPES = [
+    "Normal", "Fire", "Water", "Electric", "Grass", "Ice", "Fighting", "Poison",
+    "Ground", "Flying", "Psychic", "Bug", "Rock", "Ghost", "Dragon", "Dark", "Steel",
+]
+CATEGORIES = ["Physical", "Special", "Status"]
+QUERIES = [
+    "electric type moves",
+    "Thunderbolt",
+    "moves learnt by TM",
+    "egg moves",
+    "fire type special attacks",
+    "moves with the highest power",
+    "Quick Attack accuracy",
+    "psychic status moves",
+]
+
+
+def schema(dimensions):
+    return pa.schema(
+        [
+            pa.field("chunk_id", pa.string()),
+            pa.field("filename", pa.string()),
+            pa.field("vector", pa.list_(pa.float32(), dimensions)),
+            pa.field("content", pa.string()),
+            pa.field("metadata", pa.struct([pa.field("filename", pa.string())])),
+        ]
+    )
+
+
+def synthetic_batches(num_rows, dimensions, num_pokemon, rows_per_chunk, seed=0):
+    """
+    Yields record batches shaped like the pokemon_moves table: move tables as
+    content, one of ``num_pokemon`` synthetic filenames, and random unit
+    vectors. Everything is seeded, so a given size always produces the same
+    table.
+    """
+    rng = np.random.default_rng(seed)
+    batch_size = 10_000
+    for start in range(0, num_rows, batch_size):
+        n = min(batch_size, num_rows - start)
+
+        vectors = rng.standard_normal((n, dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+        moves = rng.integers(len(MOVES), size=(n, rows_per_chunk))
+        types = rng.integers(len(TYPES), size=(n, rows_per_chunk))
+        categories = rng.integers(len(CATEGORIES), size=(n, rows_per_chunk))
+        powers = rng.integers(10, 150, size=(n, rows_per_chunk))
+        pokemon = rng.integers(num_pokemon, size=n)
+        filenames = pa.array([f"pokemon-{p}.md" for p in pokemon])
+
+        contents = []
+        for i in range(n):
+            lines = [
+                "| Lv. | Move | Type | Cat. | Power | Acc. |",
+                "| --- | --- | --- | --- | --- | --- |",
+            ]
+            for j in range(rows_per_chunk):
+                lines.append(
+                    f"| {j + 1} | {MOVES[moves[i, j]]} | {TYPES[types[i, j]]} | "
+                    f"{CATEGORIES[categories[i, j]]} | {powers[i, j]} | 100 |"
+                )
+            contents.append("\n".join(lines))
+
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array([str(start + i) for i in range(n)]),
+                filenames,
+                pa.FixedSizeListArray.from_arrays(pa.array(vectors.ravel()), dimensions),
+                pa.array(contents),
+                pa.StructArray.from_arrays([filenames], names=["filename"]),
+            ],
+            schema=schema(dimensions),
+        )
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def latency_stats(timings):
+    timings = np.array(timings) * 1000
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(timings.mean()),
+    }
+
+
+def measure_latency(fn, iterations):
+    timings = []
+    for i in range(iterations):
+        query = QUERIES[i % len(QUERIES)]
+        start = time.perf_counter()
+        fn(query)
+        timings.append(time.perf_counter() - start)
+    return latency_stats(timings)
+
+
+def measure_qps(fn, concurrency, num_queries):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(fn, [QUERIES[i % len(QUERIES)] for i in range(num_queries)]))
+        return num_queries / (time.perf_counter() - start)
+
+
+def build_table(db, name, size, args):
+    result = {}
+    start = time.perf_counter()
+    tbl = db.create_table(
+        name,
+        data=synthetic_batches(size, args.dimensions, args.num_pokemon, args.rows_per_chunk),
+        schema=schema(args.dimensions),
+        mode="overwrite",
+    )
+    result["write_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tbl.create_fts_index("content", use_tantivy=False)
+    result["fts_index_build_s"] = time.perf_counter() - start
+
+    if args.vector_index != "none":
+        start = time.perf_counter()
+        tbl.create_index(
+            metric="l2", vector_column_name="vector", index_type=args.vector_index.upper()
+        )
+        result["vector_index_build_s"] = time.perf_counter() - start
+
+    result["disk_bytes"] = directory_size(os.path.join(args.uri, f"{name}.lance"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark retrieval on synthetic pokemon_moves tables of growing size"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--num-pokemon", type=int, default=1000)
+    parser.add_argument("--rows-per-chunk", type=int, default=12)
+    parser.add_argument(
+        "--vector-index",
+        choices=["none", "ivf_pq", "ivf_hnsw_sq", "ivf_hnsw_pq"],
+        default="none",
+    )
+    parser.add_argument(
+        "--filename-index",
+        choices=["bitmap", "btree"],
+        default="bitmap",
+        help="Scalar index built on filename for the second round of filtered searches",
+    )
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--qps-queries", type=int, default=200)
+    parser.add_argument("--uri", default="data/bench-lancedb")
+    parser.add_argument(
+        "--output",
+        default=f"bench-results/retrieval-scale-{datetime.now():%Y%m%d-%H%M%S}.json",
+    )
+    args = parser.parse_args()
+
+    db = lancedb.connect(args.uri)
+    results = {
+        "timestamp": datetime.now().isoformat(),
+        "machine": platform.platform(),
+        "config": vars(args),
+        "sizes": [],
+    }
+
+    for size in args.sizes:
+        table_name = f"pokemon_moves_{size}"
+        print(f"Building {table_name}...")
+        result = {"rows": size, **build_table(db, table_name, size, args)}
+
+        ctx = RetrievalContext(uri=args.uri, table_name=table_name)
+        # Deterministic, zero-latency query embeddings so only retrieval is measured
+        ctx.embedding_client = SimulatedEmbeddings(dimensions=args.dimensions, latency=0)
+        ctx.embedding_cache = EmbeddingCache(max_size=0)
+        set_retrieval_context(ctx)
+
+        pokemon = "pokemon-0.md"
+        # Comparative questions filter on a few pokemon at once
+        several = ["pokemon-0.md", "pokemon-1.md", "pokemon-2.md"]
+        search_fns = {
+            "vector": lambda q: perform_vector_search(q, top_k=5),
+            "vector_filtered": lambda q: perform_vector_search(q, pokemon=pokemon, top_k=5),
+            "vector_filtered_3": lambda q: perform_vector_search(q, pokemon=several, top_k=5),
+            "fts": lambda q: perform_fts_search(q, top_k=5),
+            "fts_filtered": lambda q: perform_fts_search(q, pokemon=pokemon, top_k=5),
+            "fts_filtered_3": lambda q: perform_fts_search(q, pokemon=several, top_k=5),
+        }
+        for fn in search_fns.values():
+            fn(QUERIES[0])  # Warm up
+
+        result["latency"] = {
+            name: measure_latency(fn, args.iterations) for name, fn in search_fns.items()
+        }
+
+        # Filtered searches again, now backed by a scalar index on filename
+        start = time.perf_counter()
+        ctx.table.create_scalar_index(
+            "filename", index_type=args.filename_index.upper(), replace=True
+        )
+        result["filename_index_build_s"] = time.perf_counter() - start
+        for name, fn in list(search_fns.items()):
+            if "filtered" in name:
+                fn(QUERIES[0])
+                result["latency"][f"{name}+{args.filename_index}"] = measure_latency(
+                    fn, args.iterations
+                )
+
+        results_to_build = perform_vector_search(QUERIES[0], top_k=5)
+        result["latency"]["build_context"] = measure_latency(
+            lambda _: build_context_from_results(results_to_build), args.iterations
+        )
+        result["qps"] = {
+            name: {
+                str(c): measure_qps(search_fns[name], c, args.qps_queries)
+                for c in args.concurrency
+            }
+            for name in ("vector", "fts")
+        }
+        results["sizes"].append(result)
+
+        print(
+            f"  write {result['write_s']:.1f}s, fts index {result['fts_index_build_s']:.1f}s, "
+            f"filename index {result['filename_index_build_s']:.1f}s, "
+            f"{result['disk_bytes'] / 2**20:.1f} MiB on disk"
+        )
+        for name, stats in result["latency"].items():
+            print(
+                f"  {name:<24} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms"
+                f"  p99 {stats['p99_ms']:8.2f} ms"
+            )
+        for name, qps in result["qps"].items():
+            print(f"  {name:<24} " + "  ".join(f"{c}: {q:.0f} q/s" for c, q in qps.items()))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import argparse
+import statistics
+import time
+from itertools import count
+
+import numpy as np
+import pandas as pd
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+import yahoo_finance
+from yahoo_finance import AsyncYahooFinance, YahooFinance, market_data_cache
+
+# Tools the model asks for in one response, as in the first turn of a report
+TOOL_CALLS = [
+    ("get_current_price", {}),
+    ("get_company_info", {}),
+    ("get_historical_stock_prices", {"period": "1y"}),
+    ("get_income_statements", {}),
+    ("get_analyst_recommendations", {}),
+    ("get_company_news", {}),
+]
+
+
+class StandInTicker:
+    """Local stand-in for yfinance.Ticker: sleeps like a network call, returns fixed data."""
+
+    latency = 0.3
+    slow_latency = None  # Applied to news, to simulate a request that hangs
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def _wait(self, slow=False):
+        time.sleep(self.slow_latency if slow and self.slow_latency else self.latency)
+
+    @property
+    def info(self):
+        self._wait()
+        if self.symbol == "MISSING":
+            raise ValueError(f"No data found for {self.symbol}")
+        return {"symbol": self.symbol, "shortName": self.symbol, "regularMarketPrice": 100.0}
+
+    def history(self, period="1mo", interval="1d"):
+        self._wait()
+        return self.prices()
+
+    @staticmethod
+    def prices():
+        index = pd.bdate_range(end="2025-01-01", periods=252, tz="America/New_York")
+        close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, len(index)))
+        return pd.DataFrame({"Close": close, "Volume": 1_000_000}, index=index)
+
+    @property
+    def financials(self):
+        self._wait()
+        return pd.DataFrame({"2024": [1.0e9], "2023": [0.9e9]}, index=["Total Revenue"])
+
+    @property
+    def recommendations(self):
+        self._wait()
+        return pd.DataFrame({"period": ["0m"], "buy": [10], "hold": [5], "sell": [1]})
+
+    @property
+    def news(self):
+        self._wait(slow=True)
+        return [{"title": f"{self.symbol} story {i}"} for i in range(5)]
+
+
+def stand_in_download(tickers, period="1mo", interval="1d", **kwargs):
+    """Local stand-in for yf.download: one wait, dates without a timezone like Yahoo's daily bars."""
+    time.sleep(StandInTicker.latency)
+    return pd.concat(
+        {symbol: StandInTicker.prices().tz_localize(None) for symbol in tickers}, axis=1
+    )
+
+
+def check_batch_tools():
+    # Batch calls reuse the histories single-symbol calls cached, and the
+    # other way round; one symbol failing must not fail the whole batch
+    calls = [
+        lambda: YahooFinance.get_historical_stock_prices("CHECK0", period="1y"),
+        lambda: YahooFinance.get_historical_stock_prices_batch(["CHECK0", "CHECK1"], period="1y"),
+        lambda: YahooFinance.get_historical_stock_prices("CHECK1", period="1y"),
+        lambda: YahooFinance.get_stock_fundamentals_batch(["CHECK0", "MISSING"]),
+    ]
+    for call in calls:
+        result = call()
+        assert not result.startswith(("Error", "Could not")), result
+    assert "No data for: MISSING" in result, result
+
+
+def build_agent(tools, symbols):
+    async def respond(messages, info):
+        if len(messages) == 1:
+            symbol = next(symbols)
+            return ModelResponse(
+                parts=[
+                    ToolCallPart(name, {"symbol": symbol, **kwargs})
+                    for name, kwargs in TOOL_CALLS
+                ]
+            )
+        return ModelResponse(parts=[TextPart("Report")])
+
+    return Agent(
+        FunctionModel(respond),
+        tools=[getattr(tools, name) for name, _ in TOOL_CALLS],
+    )
+
+
+def run_blocking(symbol):
+    # What the turn costs when every tool call waits for the previous one
+    for name, kwargs in TOOL_CALLS:
+        getattr(YahooFinance, name)(symbol, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Turn latency of the stock agent's tools against a local yfinance stand-in"
+    )
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per upstream call")
+    parser.add_argument(
+        "--slow-latency",
+        type=float,
+        default=None,
+        help="Make the news request take this long, to see the per-call timeout at work",
+    )
+    parser.add_argument("--timeout", type=float, default=yahoo_finance.TOOL_TIMEOUT)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    yahoo_finance.yf.Ticker = StandInTicker
+    yahoo_finance.yf.download = stand_in_download
+    StandInTicker.latency = 0
+    check_batch_tools()
+
+    StandInTicker.latency = args.latency
+    StandInTicker.slow_latency = args.slow_latency
+    yahoo_finance.TOOL_TIMEOUT = args.timeout
+
+    # A fresh symbol per turn, so every turn pays for its upstream calls
+    symbols = (f"SYM{i}" for i in count())
+    modes = {
+        "blocking calls": lambda: run_blocking(next(symbols)),
+        "sync tools": lambda: build_agent(YahooFinance, symbols).run_sync("report"),
+        "async tools": lambda: build_agent(AsyncYahooFinance, symbols).run_sync("report"),
+    }
+
+    print(
+        f"{len(TOOL_CALLS)} tool calls per turn, {args.latency}s per upstream call"
+        + (f", news takes {args.slow_latency}s" if args.slow_latency else "")
+    )
+    for name, run in modes.items():
+        timings = []
+        for _ in range(args.turns):
+            market_data_cache.clear()
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        print(
+            f"  {name:<16} median {statistics.median(timings):6.2f}s  "
+            f"max {max(timings):6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+import yahoo_finance
+from yahoo_finance import YahooFinance, estimate_tokens, market_data_cache
+
+PERIOD_DAYS = {"1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260}
+
+
+class StandInTicker:
+    """Local stand-in for yfinance.Ticker with payloads shaped like Yahoo's."""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        info = {
+            "symbol": self.symbol,
+            "shortName": f"{self.symbol} Inc.",
+            "longName": f"{self.symbol} Incorporated",
+            "longBusinessSummary": "Designs, manufactures and markets devices and services. " * 20,
+            "regularMarketPrice": 187.42,
+            "currency": "USD",
+            "marketCap": 2.9e12,
+            "sector": "Technology",
+            "industry": "Consumer Electronics",
+            "companyOfficers": [
+                {"name": f"Officer {i}", "title": "Executive", "totalPay": 1e6 + i, "yearBorn": 1970}
+                for i in range(10)
+            ],
+        }
+        info.update({field: 0.1 + i for i, field in enumerate(yahoo_finance.KEY_RATIO_FIELDS)})
+        # Yahoo returns ~150 more quote, share count and governance fields
+        info.update({f"field{i}": 1234567.891 + i for i in range(150)})
+        return info
+
+    def history(self, period="1mo", interval="1d"):
+        n = PERIOD_DAYS.get(period, 21)
+        index = pd.bdate_range(end="2025-01-01", periods=n, tz="America/New_York")
+        close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+        return pd.DataFrame(
+            {
+                "Open": close - 0.3,
+                "High": close + 1.1,
+                "Low": close - 1.2,
+                "Close": close,
+                "Volume": np.full(n, 52_000_000),
+                "Dividends": 0.0,
+                "Stock Splits": 0.0,
+            },
+            index=index,
+        )
+
+    @property
+    def financials(self):
+        years = pd.to_datetime(["2024-09-30", "2023-09-30", "2022-09-30", "2021-09-30"])
+        items = [f"Line Item {i}" for i in range(39)]
+        values = np.random.default_rng(1).uniform(1e8, 4e11, (len(items), len(years)))
+        return pd.DataFrame(values, index=items, columns=years)
+
+    @property
+    def recommendations(self):
+        return pd.DataFrame(
+            {
+                "period": ["0m", "-1m", "-2m", "-3m"],
+                "strongBuy": [8, 8, 7, 7],
+                "buy": [24, 23, 23, 22],
+                "hold": [12, 12, 13, 13],
+                "sell": [1, 1, 1, 2],
+                "strongSell": [2, 2, 2, 2],
+            }
+        )
+
+    @property
+    def news(self):
+        return [
+            {
+                "id": f"story-{i}",
+                "content": {
+                    "id": f"story-{i}",
+                    "contentType": "STORY",
+                    "title": f"{self.symbol} headline {i}",
+                    "summary": "What happened and why it matters for the stock. " * 3,
+                    "pubDate": "2025-01-01T12:00:00Z",
+                    "provider": {"displayName": "Reuters", "url": "https://www.reuters.com"},
+                    "canonicalUrl": {"url": f"https://finance.yahoo.com/news/{i}", "site": "finance"},
+                    "thumbnail": {
+                        "resolutions": [
+                            {"url": f"https://s.yimg.com/{i}/{w}.jpg", "width": w, "height": w}
+                            for w in (140, 480, 1024)
+                        ]
+                    },
+                    "finance": {"stockTickers": [{"symbol": self.symbol}]},
+                },
+            }
+            for i in range(10)
+        ]
+
+
+def previous_payloads(symbol, period):
+    """What each tool returned before projection, downsampling and CSV encoding."""
+    ticker = StandInTicker(symbol)
+    history = ticker.history(period)
+    return {
+        "get_historical_stock_prices": history.to_json(orient="index"),
+        "get_income_statements": ticker.financials.to_json(orient="index"),
+        "get_key_financial_ratios": json.dumps(ticker.info, indent=2),
+        "get_analyst_recommendations": ticker.recommendations.to_json(orient="index"),
+        "get_company_news": json.dumps(ticker.news[:3], indent=2),
+        "get_technical_indicators": history.to_json(orient="index"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Payload size of each stock tool result before and after compaction"
+    )
+    parser.add_argument("--period", default="1y", choices=list(PERIOD_DAYS))
+    args = parser.parse_args()
+
+    yahoo_finance.yf.Ticker = StandInTicker
+    market_data_cache.clear()
+
+    print(
+        f"period={args.period}, history rows <= {yahoo_finance.HISTORY_MAX_ROWS}, "
+        f"token cap {yahoo_finance.TOOL_MAX_TOKENS}"
+    )
+    print(f"{'tool':<30} {'before':>8} {'after':>8} {'tokens':>15} {'saved':>6}")
+    calls = {
+        "get_historical_stock_prices": {"period": args.period},
+        "get_technical_indicators": {"period": args.period},
+    }
+    for name, before in previous_payloads("AAPL", args.period).items():
+        after = getattr(YahooFinance, name)("AAPL", **calls.get(name, {}))
+        print(
+            f"{name:<30} {len(before):>8} {len(after):>8} "
+            f"{estimate_tokens(before):>7}->{estimate_tokens(after):<7} "
+            f"{1 - len(after) / len(before):>6.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
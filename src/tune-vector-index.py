@@ -0,0 +1,102 @@
+import argparse
+import time
+
+import lancedb
+import numpy as np
+
+from utils import LANCEDB_URI, TABLE_NAME, apply_vector_search_params
+
+
+def percentile(timings, q):
+    return float(np.percentile(timings, q)) * 1000
+
+
+def sample_queries(tbl, num_queries, seed=0):
+    """
+    Uses stored vectors, slightly perturbed, as queries so the tuning runs
+    against the real distribution of the corpus without calling the
+    embeddings API.
+    """
+    vectors = np.stack(
+        tbl.search().select(["vector"]).limit(None).to_arrow()["vector"].to_numpy(
+            zero_copy_only=False
+        )
+    )
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=num_queries, replace=len(vectors) < num_queries)
+    picks = vectors[rows]
+    noise = rng.standard_normal(picks.shape) * picks.std() * 0.1
+    return (picks + noise).astype(np.float32)
+
+
+def search_ids(tbl, query, k, exact=False, **params):
+    query_builder = tbl.search(query).limit(k).select([]).with_row_id(True)
+    if exact:
+        query_builder = query_builder.bypass_vector_index()
+    else:
+        query_builder = apply_vector_search_params(query_builder, **params)
+    return query_builder.to_arrow()["_rowid"].to_pylist()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure recall@k and latency of the vector index across search settings"
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nprobes", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+    parser.add_argument(
+        "--refine-factor",
+        type=int,
+        nargs="+",
+        default=[0, 1, 5, 10],
+        help="0 disables refinement",
+    )
+    args = parser.parse_args()
+
+    tbl = lancedb.connect(LANCEDB_URI).open_table(TABLE_NAME)
+    indices = [i for i in tbl.list_indices() if "vector" in i.columns]
+    if not indices:
+        print("The table has no vector index; build one with 00-ingestion.py --vector-index")
+        return
+    print(f"{tbl.count_rows()} rows, index: {indices[0].index_type}")
+
+    queries = sample_queries(tbl, args.queries)
+
+    exact_timings = []
+    exact_ids = []
+    for query in queries:
+        start = time.perf_counter()
+        exact_ids.append(set(search_ids(tbl, query, args.k, exact=True)))
+        exact_timings.append(time.perf_counter() - start)
+    print(
+        f"exact scan: p50 {percentile(exact_timings, 50):.2f} ms, "
+        f"p99 {percentile(exact_timings, 99):.2f} ms"
+    )
+
+    print(f"{'nprobes':>8} {'refine':>7} {f'recall@{args.k}':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for nprobes in args.nprobes:
+        for refine_factor in args.refine_factor:
+            timings = []
+            hits = 0
+            for query, expected in zip(queries, exact_ids):
+                start = time.perf_counter()
+                ids = search_ids(
+                    tbl,
+                    query,
+                    args.k,
+                    nprobes=nprobes,
+                    refine_factor=refine_factor or None,
+                )
+                timings.append(time.perf_counter() - start)
+                hits += len(expected.intersection(ids))
+
+            recall = hits / sum(len(expected) for expected in exact_ids)
+            print(
+                f"{nprobes:>8} {refine_factor:>7} {recall:>10.3f} "
+                f"{percentile(timings, 50):>8.2f} {percentile(timings, 99):>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,1091 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
 import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 from typing import Optional
 
 import lancedb
+import numpy as np
 from langchain_openai import OpenAIEmbeddings
 from langchain_text_splitters import (
     MarkdownHeaderTextSplitter,
     RecursiveCharacterTextSplitter,
 )
 
+LANCEDB_URI = "data/sample-lancedb"
+TABLE_NAME = "pokemon_moves"
 
-def perform_vector_search(query: str, pokemon: Optional[str] = None, top_k: int = 5):
-    uri = "data/sample-lancedb"
-    db = lancedb.connect(uri)
-    tbl = db.open_table("pokemon_moves")
+# Used to run the vector and full text halves of a hybrid search side by side
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="retrieval")
 
-    # Create the embedding for the query
-    embedding_client = OpenAIEmbeddings(model=os.getenv("EMBEDDINGS_MODEL", ""))
-    embedding = embedding_client.embed_query(query)
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Cache of query embeddings keyed on the embeddings model and the
+    normalized query text.
+
+    A bounded in-memory LRU sits in front of an optional sqlite file, so
+    repeated subquestions skip the embedding round trip both within a run
+    and across runs.
+    """
+
+    def __init__(self, max_size: int = 1024, path: Optional[str] = None):
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._disk.commit()
+
+    @staticmethod
+    def make_key(model: str, query: str) -> str:
+        return hashlib.sha256(
+            f"{model}\n{normalize_query(query)}".encode("utf-8")
+        ).hexdigest()
+
+    def get(self, model: str, query: str) -> Optional[list[float]]:
+        key = self.make_key(model, query)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    vector = array("f", row[0]).tolist()
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, model: str, query: str, vector: list[float]):
+        key = self.make_key(model, query)
+        with self._lock:
+            self._remember(key, vector)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, array("f", vector).tobytes()),
+                )
+                self._disk.commit()
+
+    def _remember(self, key: str, vector: list[float]):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM embeddings")
+                self._disk.commit()
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+class TokenRateLimiter:
+    """
+    Token bucket that caps how many tokens are sent per minute.
+
+    The bucket holds at most one minute worth of tokens and refills
+    continuously. A request larger than the whole bucket waits for a full
+    bucket instead of forever.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = tokens_per_minute
+        self._available = float(tokens_per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._available = min(
+            self.capacity,
+            self._available + (now - self._updated) * self.capacity / 60,
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: int):
+        tokens = min(tokens, self.capacity)
+        while True:
+            self._refill()
+            if self._available >= tokens:
+                self._available -= tokens
+                return
+            missing = tokens - self._available
+            await asyncio.sleep(missing * 60 / self.capacity)
+
+
+class ConcurrentEmbedder:
+    """
+    Wraps an embeddings client and embeds documents through a pool of
+    concurrent requests.
+
+    At most ``max_concurrency`` requests are in flight, the optional
+    ``tokens_per_minute`` budget is enforced client side, and requests that
+    fail with HTTP 429 are retried with jittered exponential backoff. Any
+    client with ``aembed_documents`` works, so a local stand-in can replace
+    the OpenAI client for offline benchmarks.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_concurrency: int = 4,
+        tokens_per_minute: Optional[int] = None,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+    ):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.rate_limiter = (
+            TokenRateLimiter(tokens_per_minute) if tokens_per_minute else None
+        )
+        self.retries = 0
+
+    async def _embed_request(self, texts, semaphore):
+        async with semaphore:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(sum(estimate_tokens(t) for t in texts))
+
+            for attempt in range(self.max_retries + 1):
+                try:
+                    return await self.client.aembed_documents(texts)
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == self.max_retries:
+                        raise
+                    self.retries += 1
+                    delay = min(60.0, self.backoff_base * 2**attempt)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def aembed_documents(self, texts: list[str], chunk_size: int = 64):
+        """Embeds ``texts`` in requests of ``chunk_size`` documents, in order."""
+        # Created per call so the embedder can be reused across event loops
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        requests = [
+            self._embed_request(texts[i : i + chunk_size], semaphore)
+            for i in range(0, len(texts), chunk_size)
+        ]
+        results = await asyncio.gather(*requests)
+        return [embedding for result in results for embedding in result]
+
+    def embed_documents(self, texts: list[str], chunk_size: int = 64):
+        return asyncio.run(self.aembed_documents(texts, chunk_size=chunk_size))
+
+
+class SimulatedRateLimitError(Exception):
+    status_code = 429
+
+
+class SimulatedEmbeddings:
+    """
+    Local stand-in for OpenAIEmbeddings used to benchmark offline.
+
+    Every request sleeps for ``latency`` seconds plus ``latency_per_text`` per
+    document and fails with a simulated 429 with probability
+    ``rate_limit_probability``. Vectors are random but seeded by the text, so
+    the same text always gets the same vector.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 1536,
+        latency: float = 0.05,
+        latency_per_text: float = 0.0,
+        rate_limit_probability: float = 0.0,
+    ):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.latency_per_text = latency_per_text
+        self.rate_limit_probability = rate_limit_probability
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8])
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def _request_latency(self, texts):
+        if random.random() < self.rate_limit_probability:
+            raise SimulatedRateLimitError("Simulated rate limit")
+        return self.latency + self.latency_per_text * len(texts)
+
+    def embed_documents(self, texts, chunk_size=None):
+        time.sleep(self._request_latency(texts))
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts, chunk_size=None):
+        await asyncio.sleep(self._request_latency(texts))
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+class HashingEmbeddings:
+    """
+    Deterministic embedder based on the hashing trick.
+
+    Lower-cased words and word bigrams are hashed into ``dimensions`` buckets
+    with a pseudo-random sign. It needs no model download or network, so
+    tests and offline runs get stable vectors whose similarity still reflects
+    shared words.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def _vector(self, text):
+        tokens = re.findall(r"\w+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest)
+            vector[bucket % self.dimensions] += 1.0 if bucket >> 63 else -1.0
+
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts, chunk_size=None):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    async def aembed_documents(self, texts, chunk_size=None):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self._vector(text)
+
+
+@lru_cache(maxsize=None)
+def _load_sentence_transformer(model_name: str, device: str, backend: str):
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        raise ImportError(
+            "Please install the sentence-transformers package using "
+            "pip install -U sentence-transformers"
+        )
+    return SentenceTransformer(model_name, device=device, backend=backend)
+
+
+class SentenceTransformerEmbeddings:
+    """
+    CPU-local embeddings from a sentence-transformers model.
+
+    The model is loaded once per process and shared by every instance;
+    ``backend="onnx"`` runs it through ONNX Runtime instead of PyTorch.
+    Documents are encoded in batches of ``batch_size``.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        batch_size: int = 64,
+        device: str = "cpu",
+        backend: str = "torch",
+    ):
+        self.batch_size = batch_size
+        self._model = _load_sentence_transformer(model_name, device, backend)
+
+    def embed_documents(self, texts, chunk_size=None):
+        return self._model.encode(
+            list(texts),
+            batch_size=chunk_size or self.batch_size,
+            normalize_embeddings=True,
+        ).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts, chunk_size=None):
+        return await asyncio.to_thread(self.embed_documents, texts, chunk_size)
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+# Embedders are identified by a "provider:model" spec, which is also what
+# ingestion records on the vector column of the table it builds.
+EMBEDDER_METADATA_KEY = "embedder"
+DEFAULT_EMBEDDING_MODELS = {
+    "openai": "",
+    "local": "sentence-transformers/all-MiniLM-L6-v2",
+    "hashing": "384",
+    "simulated": "1536",
+}
+EMBEDDING_PROVIDERS = {
+    "openai": lambda model, **kwargs: OpenAIEmbeddings(model=model, **kwargs),
+    "local": lambda model, **kwargs: SentenceTransformerEmbeddings(
+        model, backend=os.getenv("LOCAL_EMBEDDINGS_BACKEND", "torch"), **kwargs
+    ),
+    "hashing": lambda model, **kwargs: HashingEmbeddings(int(model), **kwargs),
+    "simulated": lambda model, **kwargs: SimulatedEmbeddings(
+        dimensions=int(model), latency=0, **kwargs
+    ),
+}
+
+
+def configured_embedder_spec() -> str:
+    """The embedder selected by EMBEDDINGS_PROVIDER and EMBEDDINGS_MODEL."""
+    provider = os.getenv("EMBEDDINGS_PROVIDER", "openai")
+    if provider not in EMBEDDING_PROVIDERS:
+        raise ValueError(
+            f"Unknown EMBEDDINGS_PROVIDER {provider!r}, "
+            f"expected one of {list(EMBEDDING_PROVIDERS)}"
+        )
+    model = os.getenv("EMBEDDINGS_MODEL", "") or DEFAULT_EMBEDDING_MODELS[provider]
+    return f"{provider}:{model}"
+
+
+def create_embeddings_client(spec: str, **kwargs):
+    provider, _, model = spec.partition(":")
+    return EMBEDDING_PROVIDERS[provider](model, **kwargs)
+
+
+def table_embedder_spec(schema) -> Optional[str]:
+    """The embedder recorded on a table's vector column, if any."""
+    metadata = schema.field("vector").metadata or {}
+    spec = metadata.get(EMBEDDER_METADATA_KEY.encode("utf-8"))
+    return spec.decode("utf-8") if spec is not None else None
+
+
+class RetrievalContext:
+    """
+    Process-wide handles shared by the search helpers.
+
+    The lancedb connection, the table handle and the embeddings client are
+    created lazily on first use and then reused by every search call. At most
+    every ``refresh_interval`` seconds the table is checked out at its latest
+    version, so a re-run of the ingestion script is picked up by long running
+    agents without a restart.
+
+    Queries are embedded with the embedder recorded on the table by
+    ingestion, falling back to the configured one for tables that predate
+    the record. Assigning ``embedding_client`` pins a client instead.
+    """
+
+    def __init__(
+        self,
+        uri: str = LANCEDB_URI,
+        table_name: str = TABLE_NAME,
+        refresh_interval: float = 5.0,
+    ):
+        self.uri = uri
+        self.table_name = table_name
+        self.refresh_interval = refresh_interval
+        self.version = None
+        self.filename_column = "filename"
+
+        self._lock = threading.Lock()
+        self._db = None
+        self._table = None
+        self._embedding_client = None
+        self._pinned_client = False
+        self._last_refresh = 0.0
+
+        self._async_db = None
+        self._async_table = None
+        self._async_last_refresh = 0.0
+
+        self.embedder = configured_embedder_spec()
+        self.embedding_cache = EmbeddingCache(
+            max_size=int(os.getenv("EMBEDDINGS_CACHE_SIZE", "1024")),
+            path=os.getenv("EMBEDDINGS_CACHE_PATH") or None,
+        )
+
+    @property
+    def db(self):
+        with self._lock:
+            if self._db is None:
+                self._db = lancedb.connect(self.uri)
+            return self._db
+
+    @property
+    def table(self):
+        db = self.db
+        with self._lock:
+            now = time.monotonic()
+            if self._table is None:
+                self._table = db.open_table(self.table_name)
+            elif now - self._last_refresh >= self.refresh_interval:
+                try:
+                    self._table.checkout_latest()
+                except Exception:
+                    # The table was dropped and re-created underneath us
+                    self._table = db.open_table(self.table_name)
+            else:
+                return self._table
+
+            self._last_refresh = now
+            self.version = self._table.version
+            self._apply_schema(self._table.schema)
+            return self._table
+
+    def _apply_schema(self, schema):
+        # Tables ingested before filename was promoted only have it nested
+        self.filename_column = (
+            "filename" if "filename" in schema.names else "metadata.filename"
+        )
+        spec = table_embedder_spec(schema) or configured_embedder_spec()
+        if spec != self.embedder:
+            self.embedder = spec
+            if not self._pinned_client:
+                self._embedding_client = None
+
+    @property
+    def embedding_client(self):
+        with self._lock:
+            if self._embedding_client is None:
+                self._embedding_client = create_embeddings_client(self.embedder)
+            return self._embedding_client
+
+    @embedding_client.setter
+    def embedding_client(self, client):
+        with self._lock:
+            self._embedding_client = client
+            self._pinned_client = client is not None
+
+    def embed_query(self, query: str) -> list[float]:
+        embedding = self.embedding_cache.get(self.embedder, query)
+        if embedding is None:
+            embedding = self.embedding_client.embed_query(query)
+            self.embedding_cache.put(self.embedder, query, embedding)
+        return embedding
+
+    def embed_queries(self, queries: list[str]) -> list[list[float]]:
+        """
+        Embeds several queries, sending every cache miss in a single
+        ``embed_documents`` request.
+        """
+        embeddings = [
+            self.embedding_cache.get(self.embedder, query) for query in queries
+        ]
+
+        missing = {}
+        for query, embedding in zip(queries, embeddings):
+            if embedding is None:
+                missing.setdefault(normalize_query(query), query)
+
+        if missing:
+            computed = dict(
+                zip(
+                    missing.keys(),
+                    self.embedding_client.embed_documents(list(missing.values())),
+                )
+            )
+            for query, embedding in computed.items():
+                self.embedding_cache.put(self.embedder, query, embedding)
+            embeddings = [
+                embedding
+                if embedding is not None
+                else computed[normalize_query(query)]
+                for query, embedding in zip(queries, embeddings)
+            ]
+
+        return embeddings
+
+    async def aembed_query(self, query: str) -> list[float]:
+        embedding = self.embedding_cache.get(self.embedder, query)
+        if embedding is None:
+            embedding = await self.embedding_client.aembed_query(query)
+            self.embedding_cache.put(self.embedder, query, embedding)
+        return embedding
+
+    async def async_table(self):
+        """Async counterpart of ``table``, backed by ``lancedb.connect_async``."""
+        if self._async_db is None:
+            self._async_db = await lancedb.connect_async(self.uri)
+
+        now = time.monotonic()
+        if self._async_table is None:
+            self._async_table = await self._async_db.open_table(self.table_name)
+        elif now - self._async_last_refresh >= self.refresh_interval:
+            try:
+                await self._async_table.checkout_latest()
+            except Exception:
+                self._async_table = await self._async_db.open_table(self.table_name)
+        else:
+            return self._async_table
+
+        self._async_last_refresh = now
+        self.version = await self._async_table.version()
+        schema = await self._async_table.schema()
+        with self._lock:
+            self._apply_schema(schema)
+        return self._async_table
+
+    def reset(self):
+        """Drop all cached handles; they are re-created on next use."""
+        with self._lock:
+            self._db = None
+            self._table = None
+            self._embedding_client = None
+            self._pinned_client = False
+            self._async_db = None
+            self._async_table = None
+            self.version = None
+
+
+_retrieval_context: Optional[RetrievalContext] = None
+_retrieval_context_lock = threading.Lock()
+
+
+def get_retrieval_context() -> RetrievalContext:
+    global _retrieval_context
+    with _retrieval_context_lock:
+        if _retrieval_context is None:
+            _retrieval_context = RetrievalContext()
+        return _retrieval_context
+
+
+def set_retrieval_context(ctx: RetrievalContext):
+    """Points the search helpers at another table, e.g. a benchmark corpus."""
+    global _retrieval_context
+    with _retrieval_context_lock:
+        _retrieval_context = ctx
+
+
+def apply_vector_search_params(
+    query_builder,
+    nprobes: Optional[int] = None,
+    refine_factor: Optional[int] = None,
+    ef: Optional[int] = None,
+):
+    """
+    Applies ANN tuning knobs to a lancedb vector query.
+
+    ``nprobes`` is the number of IVF partitions searched, ``refine_factor``
+    re-ranks ``top_k * refine_factor`` candidates with exact distances, and
+    ``ef`` is the HNSW candidate list size. They only matter once the table
+    has a vector index; without one every search is an exact scan.
+    """
+    if nprobes is not None:
+        query_builder = query_builder.nprobes(nprobes)
+    if refine_factor is not None:
+        query_builder = query_builder.refine_factor(refine_factor)
+    if ef is not None:
+        query_builder = query_builder.ef(ef)
+    return query_builder
+
+
+def maximal_marginal_relevance(
+    query_vector,
+    candidate_vectors,
+    top_k: int,
+    lambda_mult: float = 0.5,
+    min_score: Optional[float] = None,
+) -> list[int]:
+    """
+    Picks ``top_k`` candidates that are relevant to the query but not to
+    each other.
+
+    Relevance and the candidate-to-candidate similarity matrix are cosine
+    similarities computed in one vectorised pass; each greedy step then only
+    updates a running "most similar selected candidate" array.
+
+    Args:
+        query_vector: The query embedding.
+        candidate_vectors: One embedding per candidate.
+        top_k (int): Number of candidates to pick.
+        lambda_mult (float): 1.0 ranks purely by relevance, 0.0 purely by diversity.
+        min_score (float, optional): Candidates whose cosine similarity to the
+            query is below this are dropped first.
+
+    Returns:
+        list: Indices of the picked candidates, in pick order.
+    """
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    if len(candidates) == 0:
+        return []
+    query = np.asarray(query_vector, dtype=np.float32)
+
+    candidates = candidates / np.maximum(
+        np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12
+    )
+    query = query / max(np.linalg.norm(query), 1e-12)
+
+    relevance = candidates @ query
+    allowed = np.ones(len(candidates), dtype=bool)
+    if min_score is not None:
+        allowed = relevance >= min_score
+    similarity = candidates @ candidates.T
+
+    selected = []
+    max_similarity = np.full(len(candidates), -np.inf, dtype=np.float32)
+    for _ in range(min(top_k, int(allowed.sum()))):
+        if selected:
+            scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        else:
+            scores = relevance.copy()
+        scores[~allowed] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        allowed[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+    return selected
+
+
+def _rerank_vector_results(table, embedding, top_k, mmr_lambda=None, min_score=None):
+    """Applies MMR and/or the score cutoff to over-fetched vector results."""
+    if table.num_rows == 0:
+        return []
+    # Straight from arrow into one (n, dimensions) array, no per-row lists
+    vectors = table.column("vector").combine_chunks()
+    vectors = vectors.flatten().to_numpy().reshape(len(vectors), -1)
+    results = table.drop_columns(["vector"]).to_pylist()
+    picks = maximal_marginal_relevance(
+        embedding,
+        vectors,
+        top_k,
+        lambda_mult=1.0 if mmr_lambda is None else mmr_lambda,
+        min_score=min_score,
+    )
+    return [results[i] for i in picks]
+
+
+def filename_filter(pokemon, column: str = "filename") -> Optional[str]:
+    """
+    SQL filter restricting a search to the chunks of one or more files.
+
+    lancedb filters are SQL strings without bind parameters, so every name
+    is quoted as a SQL literal, with apostrophes doubled, instead of being
+    pasted into the string. Names match the stored filenames exactly,
+    including their case.
+
+    Args:
+        pokemon (str or list): A filename such as "pikachu.md", or several.
+        column (str): The filename column of the table.
+
+    Returns:
+        str: The filter, or None when no filenames are given.
+    """
+    if not pokemon:
+        return None
+    names = [pokemon] if isinstance(pokemon, str) else list(pokemon)
+    literals = ", ".join(
+        "'" + name.replace("'", "''") + "'" for name in names
+    )
+    if len(names) == 1:
+        return f"{column} = {literals}"
+    return f"{column} IN ({literals})"
+
+
+def perform_vector_search(
+    query: str,
+    pokemon: Optional[str | list[str]] = None,
+    top_k: int = 5,
+    nprobes: Optional[int] = None,
+    refine_factor: Optional[int] = None,
+    ef: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    fetch_k: Optional[int] = None,
+    min_score: Optional[float] = None,
+):
+    """
+    Vector search over the pokemon_moves table.
+
+    ``pokemon`` restricts the search to one filename or a list of them, and
+    is applied before the search so ``top_k`` results come back whenever the
+    files have that many chunks.
+
+    Setting ``mmr_lambda`` or ``min_score`` enables a post-retrieval stage:
+    ``fetch_k`` candidates (default ``4 * top_k``) are fetched with their
+    vectors, those with a cosine similarity below ``min_score`` are dropped
+    and ``top_k`` are picked with Maximal Marginal Relevance.
+    """
+    ctx = get_retrieval_context()
+    tbl = ctx.table
+
+    # Create the embedding for the query, reusing a cached one if possible
+    embedding = ctx.embed_query(query)
+
+    rerank = mmr_lambda is not None or min_score is not None
+    columns = ["content", "metadata", "vector"] if rerank else ["content", "metadata"]
+    limit = (fetch_k or 4 * top_k) if rerank else top_k
 
     # Perform the vector search
-    query_builder = tbl.search(embedding).limit(top_k).select(["content", "metadata"])
-    if pokemon is not None:
-        query_builder = query_builder.where(f"metadata.filename = '{pokemon}'")
+    query_builder = tbl.search(embedding).limit(limit).select(columns)
+    query_builder = apply_vector_search_params(query_builder, nprobes, refine_factor, ef)
+    where = filename_filter(pokemon, ctx.filename_column)
+    if where is not None:
+        query_builder = query_builder.where(where, prefilter=True)
 
-    results = query_builder.to_list()
+    if rerank:
+        return _rerank_vector_results(
+            query_builder.to_arrow(), embedding, top_k, mmr_lambda, min_score
+        )
+    return query_builder.to_list()
+
+
+def perform_vector_search_batch(
+    queries: list[str],
+    pokemon: Optional[str | list[str]] = None,
+    top_k: int = 5,
+    nprobes: Optional[int] = None,
+    refine_factor: Optional[int] = None,
+    ef: Optional[int] = None,
+):
+    """
+    Runs a vector search for every query in one go.
+
+    All queries are embedded with a single request and searched with one
+    multi-vector lancedb query, which returns ``top_k`` rows per query.
+
+    Returns:
+        list: One list of results per query, in the order of ``queries``.
+    """
+    if not queries:
+        return []
+
+    ctx = get_retrieval_context()
+    tbl = ctx.table
+    embeddings = ctx.embed_queries(queries)
+
+    query_builder = (
+        tbl.search(embeddings).limit(top_k).select(["content", "metadata"])
+    )
+    query_builder = apply_vector_search_params(query_builder, nprobes, refine_factor, ef)
+    where = filename_filter(pokemon, ctx.filename_column)
+    if where is not None:
+        query_builder = query_builder.where(where, prefilter=True)
+
+    results = [[] for _ in queries]
+    for result in query_builder.to_list():
+        # Single vector queries come back without a query_index column
+        results[result.pop("query_index", 0)].append(result)
+    for query_results in results:
+        query_results.sort(key=lambda r: r["_distance"])
     return results
 
 
-def perform_fts_search(query: str, pokemon: Optional[str] = None, top_k: int = 5):
-    uri = "data/sample-lancedb"
-    db = lancedb.connect(uri)
-    tbl = db.open_table("pokemon_moves")
+def perform_fts_search(query: str, pokemon: Optional[str | list[str]] = None, top_k: int = 5):
+    ctx = get_retrieval_context()
+    tbl = ctx.table
 
     query_builder = (
         tbl.search(query, query_type="fts").limit(top_k).select(["content", "metadata"])
     )
-    if pokemon is not None:
-        query_builder = query_builder.where(
-            f"metadata.filename = '{pokemon.lower()}'", prefilter=True
-        )
+    where = filename_filter(pokemon, ctx.filename_column)
+    if where is not None:
+        query_builder = query_builder.where(where, prefilter=True)
     results = query_builder.to_list()
     return results
 
 
-def build_context_from_results(results):
-    return "---\n".join(
-        [
-            f"Title: {result['metadata']['filename']}\nContent:\n{result['content']}\n"
-            for result in results
-        ]
+def reciprocal_rank_fusion(result_lists, weights=None, k: int = 60):
+    """
+    Fuses several ranked result lists into one.
+
+    Each chunk scores ``weight / (k + rank)`` in every list it appears in and
+    the scores are summed. Chunks are identified by filename and content, so a
+    chunk returned by more than one search appears once in the output.
+
+    Args:
+        result_lists (list): Ranked lists of search results.
+        weights (list, optional): One weight per list. Defaults to 1.0 each.
+        k (int): Damping constant; larger values flatten the rank curve.
+
+    Returns:
+        list: Results ordered by fused score, each with a '_relevance_score' key.
+    """
+    weights = weights or [1.0] * len(result_lists)
+    fused = {}
+    for results, weight in zip(result_lists, weights):
+        for rank, result in enumerate(results, start=1):
+            key = (result["metadata"].get("filename"), result["content"])
+            if key not in fused:
+                fused[key] = {
+                    "content": result["content"],
+                    "metadata": result["metadata"],
+                    "_relevance_score": 0.0,
+                }
+            fused[key]["_relevance_score"] += weight / (k + rank)
+
+    return sorted(fused.values(), key=lambda r: r["_relevance_score"], reverse=True)
+
+
+def perform_hybrid_search(
+    query: str,
+    pokemon: Optional[str | list[str]] = None,
+    top_k: int = 5,
+    vector_weight: float = 1.0,
+    fts_weight: float = 1.0,
+):
+    # Over-fetch from both searches so the fusion has something to re-rank
+    candidates = top_k * 2
+    vector_future = _search_executor.submit(
+        perform_vector_search, query, pokemon, candidates
+    )
+    fts_future = _search_executor.submit(perform_fts_search, query, pokemon, candidates)
+
+    results = reciprocal_rank_fusion(
+        [vector_future.result(), fts_future.result()],
+        weights=[vector_weight, fts_weight],
+    )
+    return results[:top_k]
+
+
+async def aperform_vector_search(
+    query: str,
+    pokemon: Optional[str | list[str]] = None,
+    top_k: int = 5,
+    nprobes: Optional[int] = None,
+    refine_factor: Optional[int] = None,
+    ef: Optional[int] = None,
+    mmr_lambda: Optional[float] = None,
+    fetch_k: Optional[int] = None,
+    min_score: Optional[float] = None,
+):
+    ctx = get_retrieval_context()
+    # The table decides which embedder the query must go through
+    tbl = await ctx.async_table()
+    embedding = await ctx.aembed_query(query)
+
+    rerank = mmr_lambda is not None or min_score is not None
+    columns = ["content", "metadata", "vector"] if rerank else ["content", "metadata"]
+    limit = (fetch_k or 4 * top_k) if rerank else top_k
+
+    query_builder = tbl.vector_search(embedding).limit(limit).select(columns)
+    query_builder = apply_vector_search_params(query_builder, nprobes, refine_factor, ef)
+    # Async vector queries filter before the search unless postfilter() is set
+    where = filename_filter(pokemon, ctx.filename_column)
+    if where is not None:
+        query_builder = query_builder.where(where)
+
+    if rerank:
+        return _rerank_vector_results(
+            await query_builder.to_arrow(), embedding, top_k, mmr_lambda, min_score
+        )
+    return await query_builder.to_list()
+
+
+async def aperform_fts_search(
+    query: str, pokemon: Optional[str | list[str]] = None, top_k: int = 5
+):
+    ctx = get_retrieval_context()
+    tbl = await ctx.async_table()
+
+    # Filters on full text queries are applied before the search by default
+    query_builder = (
+        tbl.query().nearest_to_text(query).limit(top_k).select(["content", "metadata"])
+    )
+    where = filename_filter(pokemon, ctx.filename_column)
+    if where is not None:
+        query_builder = query_builder.where(where)
+
+    return await query_builder.to_list()
+
+
+async def aperform_hybrid_search(
+    query: str,
+    pokemon: Optional[str | list[str]] = None,
+    top_k: int = 5,
+    vector_weight: float = 1.0,
+    fts_weight: float = 1.0,
+):
+    candidates = top_k * 2
+    vector_results, fts_results = await asyncio.gather(
+        aperform_vector_search(query, pokemon, candidates),
+        aperform_fts_search(query, pokemon, candidates),
     )
 
+    results = reciprocal_rank_fusion(
+        [vector_results, fts_results], weights=[vector_weight, fts_weight]
+    )
+    return results[:top_k]
+
+
+def merge_overlapping_chunks(a: str, b: str, min_overlap: int = 20, max_overlap: int = 500):
+    """
+    Joins two chunks of the same file when one continues the other.
+
+    Returns the merged text when one chunk contains the other or the end of
+    one is the start of the other (the splitter's chunk overlap), otherwise
+    None.
+    """
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for first, second in ((a, b), (b, a)):
+        for k in range(min(len(first), len(second), max_overlap), min_overlap - 1, -1):
+            if first.endswith(second[:k]):
+                return first + second[k:]
+    return None
+
+
+def build_context_from_results(results, token_budget: Optional[int] = None, sources: Optional[set] = None):
+    """
+    Builds the prompt context from search results.
+
+    Results are expected best first, as every search helper returns them.
+    Duplicate chunks are dropped and overlapping chunks of the same file are
+    merged into one passage, which keeps the rank of its best chunk. Passages
+    are then packed best first until ``token_budget`` (estimated) tokens are
+    used; passages that don't fit are skipped in favour of smaller ones.
+
+    Args:
+        results (list): Search results with 'content' and 'metadata' keys.
+        token_budget (int, optional): Defaults to CONTEXT_TOKEN_BUDGET or 4000.
+            Zero or less disables the budget.
+        sources (set, optional): Receives the filename of every passage that
+            made it into the context.
+
+    Returns:
+        str: The formatted context.
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+
+    passages = []
+    for rank, result in enumerate(results):
+        passage = {
+            "filename": result["metadata"]["filename"],
+            "content": result["content"],
+            "rank": rank,
+        }
+        # Fold the chunk into every passage it overlaps; one chunk can bridge
+        # two passages that were not adjacent before
+        merged_any = True
+        while merged_any:
+            merged_any = False
+            for other in passages:
+                if other["filename"] != passage["filename"]:
+                    continue
+                merged = merge_overlapping_chunks(other["content"], passage["content"])
+                if merged is not None:
+                    passages.remove(other)
+                    passage["content"] = merged
+                    passage["rank"] = min(passage["rank"], other["rank"])
+                    merged_any = True
+                    break
+        passages.append(passage)
+
+    blocks = []
+    used = 0
+    for passage in sorted(passages, key=lambda p: p["rank"]):
+        block = f"Title: {passage['filename']}\nContent:\n{passage['content']}\n"
+        tokens = estimate_tokens(block)
+        if token_budget > 0 and used + tokens > token_budget:
+            if blocks:
+                continue
+            # Never return an empty context; cut the best passage to fit
+            block = block[: token_budget * 4]
+            tokens = token_budget
+        blocks.append(block)
+        used += tokens
+        if sources is not None:
+            sources.add(passage["filename"])
+
+    return "---\n".join(blocks)
+
+
+_SCRIPT_OR_STYLE = re.compile(r"<(script|style)\b.*?</\1>", re.DOTALL | re.IGNORECASE)
+_JS_OR_CSS_LINE = re.compile(
+    r"^\s*(?:var |function\b|\(function|[.#]?[\w\-]+(?:[ >:.#][\w\-]+)*\s*\{.*\}\s*$)"
+)
+# A linked image followed by its caption, e.g. [![Pikachu](sprite.png) <br>Pikachu](/pokedex/pikachu)
+_CAPTIONED_IMAGE_LINK = re.compile(
+    r"\[\s*!\[([^\]]*)\]\([^)]*\)\s*(?:<br>)?\s*([^\]]*)\]\([^)]*\)"
+)
+_MARKDOWN_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MARKDOWN_LINK = re.compile(r"\[([^\]]*)\]\([^)\s]*(?:\s+\"[^\"]*\")?\)")
+_FOOTER = re.compile(r"^\[?Privacy Policy\]?.*$", re.MULTILINE)
+
+
+def clean_scraped_markdown(text):
+    """
+    Strips site boilerplate from a scraped page, keeping the main content.
+
+    Everything before the first level one heading (page title, inline JS and
+    CSS, the site navigation menu) and the footer is dropped. Images and links
+    are reduced to their text, which keeps table cells such as the move
+    category while removing URLs that only cost tokens.
+
+    Args:
+        text (str): Markdown of a scraped page.
+
+    Returns:
+        str: The cleaned markdown.
+    """
+    text = _SCRIPT_OR_STYLE.sub("", text)
+
+    main_start = re.search(r"^# ", text, re.MULTILINE)
+    if main_start is not None:
+        text = text[main_start.start() :]
+    else:
+        # No heading to anchor on; fall back to dropping JS/CSS looking lines
+        text = "\n".join(
+            line for line in text.splitlines() if not _JS_OR_CSS_LINE.match(line)
+        )
+
+    text = _FOOTER.sub("", text)
+    text = _CAPTIONED_IMAGE_LINK.sub(lambda m: m.group(2).strip() or m.group(1), text)
+    text = _MARKDOWN_IMAGE.sub(r"\1", text)
+    text = _MARKDOWN_LINK.sub(r"\1", text)
+    text = text.replace("<br>", " ")
+    text = re.sub(r"[ \t]+\n", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip() + "\n"
+
 
 def recursive_text_splitter(data, chunk_size, overlap_size):
     text_splitter = RecursiveCharacterTextSplitter(
@@ -94,20 +1129,408 @@ def markdown_splitter(data, chunk_size, overlap_size):
     return text_splitter.split_documents(md_splits)
 
 
-def read_files_as_object_array(directory_path):
-    """
-    Reads all files in the specified directory and returns their contents as an array of objects.
+def token_splitter(data, chunk_size, overlap_size):
+    # Sizes are counted in cl100k_base tokens, the encoding of the OpenAI embedders
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name="cl100k_base",
+        chunk_size=chunk_size,
+        chunk_overlap=overlap_size,
+    )
 
-    Each object contains the filename and the content of the file.
+    texts = text_splitter.create_documents(
+        [f"{text['filename']}\n{text['content']}" for text in data],
+        metadatas=[dict({"filename": text["filename"]}) for text in data],
+    )
+    return texts
+
+
+# Chunking strategies selectable at ingestion, with their default chunk size
+# and overlap (characters, or tokens for the token based splitter)
+CHUNKING_STRATEGIES = {
+    "recursive": (recursive_text_splitter, 3000, 100),
+    "markdown": (markdown_splitter, 3000, 100),
+    "tokens": (token_splitter, 750, 25),
+}
+
+
+def split_file(file, strategy="recursive", chunk_size=None, overlap_size=None, clean=True):
+    """
+    Cleans and splits one file with a chunking strategy.
 
     Args:
-        directory_path (str): Path to the directory containing the files.
+        file (dict): A dictionary with "filename" and "content" keys.
+        strategy (str): One of ``CHUNKING_STRATEGIES``.
+        chunk_size (int): Overrides the strategy's default chunk size.
+        overlap_size (int): Overrides the strategy's default overlap.
+        clean (bool): Strip scraped-page boilerplate before splitting.
 
     Returns:
-        list: A list of dictionaries, where each dictionary has 'filename' and 'content' keys.
+        tuple: The file's stats (raw size, sha256, raw and cleaned length) and
+        its chunks as (content, metadata) pairs. Chunks only keep the filename
+        as metadata, and markdown chunks are prefixed with the filename and
+        their headers, which the header splitter strips from the content.
+    """
+    splitter, default_size, default_overlap = CHUNKING_STRATEGIES[strategy]
+    if chunk_size is None:
+        chunk_size = default_size
+    if overlap_size is None:
+        overlap_size = default_overlap
+    raw = file["content"].encode("utf-8")
+    stats = {
+        "size": len(raw),
+        "sha256": hashlib.sha256(raw).hexdigest(),
+        "raw_chars": len(file["content"]),
+    }
+    content = clean_scraped_markdown(file["content"]) if clean else file["content"]
+    stats["clean_chars"] = len(content)
+
+    docs = splitter(
+        [{"filename": file["filename"], "content": content}],
+        chunk_size,
+        overlap_size,
+    )
+    chunks = []
+    for doc in docs:
+        headers = [doc.metadata[h] for h in ("h1", "h2", "h3") if h in doc.metadata]
+        text = doc.page_content
+        if strategy == "markdown":
+            text = "\n".join([file["filename"], *headers, text])
+        chunks.append((text, {"filename": file["filename"]}))
+    return stats, chunks
+
+
+def iter_split_files(files, workers=1, **split_kwargs):
+    """
+    Yields ``(file, stats, chunks)`` from ``split_file`` for every file, in order.
+
+    With more than one worker, files are split in a process pool. At most a
+    few files per worker are in flight, so large corpora still stream
+    through without being held in memory.
+    """
+    if workers <= 1:
+        for file in files:
+            yield (file, *split_file(file, **split_kwargs))
+        return
+
+    # lancedb isn't fork-safe, so workers are spawned fresh
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        pending = deque()
+        for file in files:
+            pending.append((file, executor.submit(split_file, file, **split_kwargs)))
+            if len(pending) >= workers * 4:
+                file, future = pending.popleft()
+                yield (file, *future.result())
+        while pending:
+            file, future = pending.popleft()
+            yield (file, *future.result())
+
+
+def corpus_catalog_path(uri: str = LANCEDB_URI, table_name: str = TABLE_NAME) -> str:
+    # Kept next to the table rather than in data/, which is ingested as a whole
+    return os.path.join(uri, f"{table_name}.catalog.json")
+
+
+def write_corpus_catalog(catalog: dict, path: Optional[str] = None):
+    """
+    Persists the corpus catalog written by ingestion.
+
+    The catalog maps every ingested filename to its size, content hash and
+    chunk count. It is written to a temporary file and moved into place so
+    readers never see a partial file.
+    """
+    path = path or corpus_catalog_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(catalog, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+_catalog_cache = {}
+_catalog_cache_lock = threading.Lock()
+
+
+def load_corpus_catalog(path: Optional[str] = None) -> Optional[dict]:
+    """
+    Returns the corpus catalog, or None if ingestion hasn't written one.
+
+    The parsed catalog is cached per process and only re-read when the file's
+    modification time changes, so callers can use it on every agent run.
+    """
+    path = path or corpus_catalog_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    with _catalog_cache_lock:
+        cached = _catalog_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r", encoding="utf-8") as file:
+            catalog = json.load(file)
+        _catalog_cache[path] = (mtime, catalog)
+        return catalog
+
+
+def list_pokemon(directory_path: str = "data/") -> list[str]:
+    """
+    Names of the pokemon that can be searched, taken from the corpus catalog.
+
+    Falls back to listing the filenames in ``directory_path`` (without reading
+    them) when no catalog has been written yet.
+    """
+    catalog = load_corpus_catalog()
+    if catalog is not None:
+        filenames = list(catalog["files"])
+    else:
+        filenames = [
+            name
+            for name in os.listdir(directory_path)
+            if os.path.isfile(os.path.join(directory_path, name))
+        ]
+    return [filename.split(".")[0] for filename in sorted(filenames)]
+
+
+def mentioned_pokemon(query: str) -> frozenset:
+    """Names from the corpus that appear as words in ``query``, lower-cased."""
+    names = {name.lower() for name in list_pokemon()}
+    return frozenset(
+        word for word in re.findall(r"[\w-]+", query.lower()) if word in names
+    )
+
+
+class SemanticAnswerCache:
+    """
+    Cache of final agent answers keyed on the embedding of the question.
+
+    A question is answered from the cache when an earlier one is at least
+    ``threshold`` cosine-similar, names the same pokemon and is younger than
+    ``ttl`` seconds. Every entry remembers the content hash of the files its
+    answer was built from, as recorded in the corpus catalog, and is dropped
+    as soon as ingestion changes or removes one of them. The least recently
+    used entries are evicted beyond ``max_size``; with ``path`` set, entries
+    are also kept in a sqlite file across runs.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 256,
+        ttl: float = 86400.0,
+        threshold: float = 0.9,
+        path: Optional[str] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS answers (id INTEGER PRIMARY KEY, "
+                "embedder TEXT, query TEXT, vector BLOB, answer TEXT, "
+                "sources TEXT, created REAL)"
+            )
+            self._disk.commit()
+            rows = self._disk.execute(
+                "SELECT id, embedder, query, vector, answer, sources, created "
+                "FROM answers ORDER BY created"
+            ).fetchall()
+            for id_, embedder, query, vector, answer, sources, created in rows:
+                self._entries[id_] = {
+                    "embedder": embedder,
+                    "query": query,
+                    "vector": np.frombuffer(vector, dtype=np.float32),
+                    "pokemon": mentioned_pokemon(query),
+                    "answer": answer,
+                    "sources": json.loads(sources),
+                    "created": created,
+                }
+                self._next_id = id_ + 1
+            self._evict()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_fresh(self, entry, files, now) -> bool:
+        if now - entry["created"] > self.ttl:
+            return False
+        return all(
+            files.get(filename, {}).get("sha256") == sha256
+            for filename, sha256 in entry["sources"].items()
+        )
+
+    def _forget(self, ids):
+        for id_ in ids:
+            del self._entries[id_]
+        if self._disk is not None and ids:
+            self._disk.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in ids])
+            self._disk.commit()
+
+    def _evict(self):
+        overflow = len(self._entries) - self.max_size
+        if overflow > 0:
+            self._forget(list(self._entries)[:overflow])
+
+    def lookup(self, embedder: str, query: str, vector) -> Optional[str]:
+        """Returns the cached answer to a question similar to ``query``, if any."""
+        vector = self._unit(vector)
+        pokemon = mentioned_pokemon(query)
+        files = (load_corpus_catalog() or {}).get("files", {})
+        now = time.time()
+        with self._lock:
+            stale = [
+                id_
+                for id_, entry in self._entries.items()
+                if not self._is_fresh(entry, files, now)
+            ]
+            self.invalidated += len(stale)
+            self._forget(stale)
+
+            candidates = [
+                id_
+                for id_, entry in self._entries.items()
+                if entry["embedder"] == embedder
+                and entry["pokemon"] == pokemon
+                and len(entry["vector"]) == len(vector)
+            ]
+            if candidates:
+                matrix = np.stack([self._entries[id_]["vector"] for id_ in candidates])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(candidates[best])
+                    self.hits += 1
+                    return self._entries[candidates[best]]["answer"]
+
+            self.misses += 1
+            return None
+
+    def store(self, embedder: str, query: str, vector, answer: str, sources):
+        """
+        Caches ``answer`` to ``query``. ``sources`` are the filenames the
+        answer was retrieved from; their current hashes are taken from the
+        corpus catalog.
+        """
+        files = (load_corpus_catalog() or {}).get("files", {})
+        entry = {
+            "embedder": embedder,
+            "query": query,
+            "vector": self._unit(vector),
+            "pokemon": mentioned_pokemon(query),
+            "answer": answer,
+            "sources": {
+                filename: files.get(filename, {}).get("sha256")
+                for filename in sorted(set(sources))
+            },
+            "created": time.time(),
+        }
+        with self._lock:
+            id_ = self._next_id
+            self._next_id += 1
+            self._entries[id_] = entry
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT INTO answers (id, embedder, query, vector, answer, sources, "
+                    "created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        id_,
+                        embedder,
+                        query,
+                        entry["vector"].tobytes(),
+                        answer,
+                        json.dumps(entry["sources"]),
+                        entry["created"],
+                    ),
+                )
+                self._disk.commit()
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidated": self.invalidated,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.invalidated = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM answers")
+                self._disk.commit()
+
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> SemanticAnswerCache:
+    """The process-wide answer cache, configured from ANSWER_CACHE_* variables."""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticAnswerCache(
+                max_size=int(os.getenv("ANSWER_CACHE_SIZE", "256")),
+                ttl=float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+                threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9")),
+                path=os.getenv("ANSWER_CACHE_PATH") or None,
+            )
+        return _answer_cache
+
+
+def get_cached_answer(query: str) -> Optional[str]:
+    """Looks ``query`` up in the answer cache, embedding it on the way."""
+    ctx = get_retrieval_context()
+    ctx.table  # Resolves the embedder recorded on the table
+    return get_answer_cache().lookup(ctx.embedder, query, ctx.embed_query(query))
+
+
+def cache_answer(query: str, answer: str, sources):
+    """Stores the final answer to ``query`` with the filenames it came from."""
+    ctx = get_retrieval_context()
+    vector = ctx.embed_query(query)  # Served by the embedding cache
+    get_answer_cache().store(ctx.embedder, query, vector, answer, sources)
+
+
+async def aget_cached_answer(query: str) -> Optional[str]:
+    ctx = get_retrieval_context()
+    await ctx.async_table()  # Resolves the embedder recorded on the table
+    vector = await ctx.aembed_query(query)
+    return get_answer_cache().lookup(ctx.embedder, query, vector)
+
+
+async def acache_answer(query: str, answer: str, sources):
+    ctx = get_retrieval_context()
+    vector = await ctx.aembed_query(query)  # Served by the embedding cache
+    get_answer_cache().store(ctx.embedder, query, vector, answer, sources)
+
+
+def iter_files_as_objects(directory_path):
     """
-    object_array = []
+    Lazily reads the files in the specified directory, one at a time.
 
+    Args:
+        directory_path (str): Path to the directory containing the files.
+
+    Yields:
+        dict: A dictionary with 'filename' and 'content' keys for each file.
+    """
     # Iterate through all files in the directory
     for file_name in os.listdir(directory_path):
         file_path = os.path.join(directory_path, file_name)
@@ -119,9 +1542,21 @@ def read_files_as_object_array(directory_path):
                 with open(file_path, "r", encoding="utf-8") as file:
                     content = file.read()
 
-                # Append the file name and content as an object to the array
-                object_array.append({"filename": file_name, "content": content})
+                yield {"filename": file_name, "content": content}
             except Exception as e:
                 print(f"Error reading file {file_name}: {e}")
 
-    return object_array
\ No newline at end of file
+
+def read_files_as_object_array(directory_path):
+    """
+    Reads all files in the specified directory and returns their contents as an array of objects.
+
+    Each object contains the filename and the content of the file.
+
+    Args:
+        directory_path (str): Path to the directory containing the files.
+
+    Returns:
+        list: A list of dictionaries, where each dictionary has 'filename' and 'content' keys.
+    """
+    return list(iter_files_as_objects(directory_path))
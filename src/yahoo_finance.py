@@ -1,10 +1,400 @@
+import asyncio
+import functools
 import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
 
 try:
     import yfinance as yf
 except ImportError:
     raise ImportError('Please install the yfinance package using pip install -U yfinance')
 
+# How long each kind of data may be reused, in seconds. Quotes read the same
+# info payload as company profiles but accept a much older copy.
+CACHE_TTLS = {
+    "quote": float(os.getenv("YF_QUOTE_TTL", "60")),
+    "info": float(os.getenv("YF_INFO_TTL", "3600")),
+    "history": float(os.getenv("YF_HISTORY_TTL", "900")),
+    "financials": float(os.getenv("YF_FINANCIALS_TTL", "86400")),
+    "recommendations": float(os.getenv("YF_FINANCIALS_TTL", "86400")),
+    "news": float(os.getenv("YF_NEWS_TTL", "900")),
+}
+
+# Tool results go straight into the model's context: long histories are
+# bucketed down to YF_HISTORY_MAX_ROWS rows and any result is cut at
+# YF_TOOL_MAX_TOKENS estimated tokens
+HISTORY_MAX_ROWS = int(os.getenv("YF_HISTORY_MAX_ROWS", "60"))
+TOOL_MAX_TOKENS = int(os.getenv("YF_TOOL_MAX_TOKENS", "2000"))
+
+# Fields of ``info`` returned by get_key_financial_ratios
+KEY_RATIO_FIELDS = [
+    "trailingPE",
+    "forwardPE",
+    "pegRatio",
+    "priceToBook",
+    "priceToSalesTrailing12Months",
+    "enterpriseToRevenue",
+    "enterpriseToEbitda",
+    "grossMargins",
+    "operatingMargins",
+    "ebitdaMargins",
+    "profitMargins",
+    "returnOnEquity",
+    "returnOnAssets",
+    "currentRatio",
+    "quickRatio",
+    "debtToEquity",
+    "revenueGrowth",
+    "earningsGrowth",
+    "dividendYield",
+    "payoutRatio",
+    "beta",
+]
+
+
+class MarketDataCache:
+    """
+    Bounded LRU cache of Yahoo Finance payloads, keyed per symbol and dataset.
+
+    Entries remember when they were fetched and every read says how old a
+    copy it accepts, so datasets shared by several tools (like ``info``) are
+    fetched once. Concurrent misses on the same key are coalesced: the first
+    caller fetches while the others wait for its result. Errors are not
+    cached.
+    """
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def get(self, key: tuple, max_age: float, loader):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def peek(self, key: tuple, max_age: float):
+        """Returns a fresh enough cached value, or None without fetching."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= max_age:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            return None
+
+    def put(self, key: tuple, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "size": len(self._entries),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+
+market_data_cache = MarketDataCache(max_size=int(os.getenv("YF_CACHE_SIZE", "512")))
+
+
+def _fetch(symbol: str, dataset: str, kind: str, loader, *args):
+    """Reads ``dataset`` of ``symbol`` through the shared cache."""
+    key = (symbol.upper(), dataset, *args)
+    return market_data_cache.get(key, CACHE_TTLS[kind], loader)
+
+
+def fetch_info(symbol: str, kind: str = "info") -> dict:
+    return _fetch(symbol, "info", kind, lambda: yf.Ticker(symbol).info)
+
+
+def _local_time_index(history: pd.DataFrame) -> pd.DataFrame:
+    # Ticker.history dates bars in the exchange's timezone while yf.download
+    # drops it, so both are stored in exchange local time without a timezone
+    if getattr(history.index, "tz", None) is not None:
+        history = history.tz_localize(None)
+    return history
+
+
+def fetch_history(symbol: str, period: str = "1mo", interval: str = "1d"):
+    return _fetch(
+        symbol,
+        "history",
+        "history",
+        lambda: _local_time_index(yf.Ticker(symbol).history(period=period, interval=interval)),
+        period,
+        interval,
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token, as in utils.estimate_tokens
+    return len(text) // 4 + 1
+
+
+def cap_tokens(text: str, max_tokens: int = None) -> str:
+    """Cuts ``text`` at the last line break that fits in ``max_tokens`` estimated tokens."""
+    max_tokens = max_tokens or TOOL_MAX_TOKENS
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    cut = text[: max_tokens * 4 - 80]
+    if "\n" in cut:
+        cut = cut[: cut.rindex("\n") + 1]
+    return f"{cut}\n[truncated to about {max_tokens} of {tokens} tokens]"
+
+
+def compact_json(data) -> str:
+    """JSON without whitespace or empty fields."""
+    if isinstance(data, dict):
+        data = {key: value for key, value in data.items() if value not in (None, "", "N/A")}
+    return json.dumps(data, separators=(",", ":"), default=str)
+
+
+def project_fields(summary: dict, info: dict, fields: list[str] = None) -> dict:
+    """
+    Keeps only ``fields`` of a tool's summary, in the order asked for.
+
+    A field the summary does not have is read from the raw Yahoo ``info``
+    payload instead, so callers can ask for anything Yahoo reports.
+    Without ``fields`` the whole summary is returned.
+    """
+    if not fields:
+        return summary
+    return {field: summary[field] if field in summary else info.get(field) for field in fields}
+
+
+def downsample(history: pd.DataFrame, max_rows: int = None) -> pd.DataFrame:
+    """
+    Buckets a price history into at most ``max_rows`` consecutive periods.
+
+    Each bucket keeps the open of its first row, the high/low extremes, the
+    close of its last row and the summed volume, and is dated by its last row.
+    """
+    max_rows = max_rows or HISTORY_MAX_ROWS
+    if len(history) <= max_rows:
+        return history
+    size = -(-len(history) // max_rows)
+    # Anchor buckets on the newest row so the latest close is always exact
+    buckets = (np.arange(len(history)) + (-len(history)) % size) // size
+    aggregations = {
+        "Open": "first",
+        "High": "max",
+        "Low": "min",
+        "Close": "last",
+        "Volume": "sum",
+        "Dividends": "sum",
+        "Stock Splits": "max",
+    }
+    sampled = history.groupby(buckets).agg(
+        {column: aggregations.get(column, "last") for column in history.columns}
+    )
+    sampled.index = history.index[np.flatnonzero(np.diff(buckets, append=buckets[-1] + 1))]
+    return sampled
+
+
+def date_format(interval: str) -> str:
+    return "%Y-%m-%d %H:%M" if interval.endswith(("m", "h")) else "%Y-%m-%d"
+
+
+def history_to_csv(history: pd.DataFrame, interval: str = "1d", max_rows: int = None) -> str:
+    """OHLCV history as CSV, downsampled, with dividend/split columns only when non-zero."""
+    columns = [c for c in ("Open", "High", "Low", "Close", "Volume") if c in history]
+    columns += [c for c in ("Dividends", "Stock Splits") if c in history and history[c].any()]
+    history = downsample(history[columns], max_rows).round(2)
+    if "Volume" in history:
+        history["Volume"] = history["Volume"].fillna(0).astype("int64")
+    return history.to_csv(index_label="Date", date_format=date_format(interval))
+
+
+MOVING_AVERAGE_WINDOWS = (20, 50, 200)
+
+
+def _wilder(values, window: int):
+    # Wilder's smoothing, as used by RSI and ATR
+    return values.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+
+
+def compute_indicators(close, high=None, low=None, volume=None) -> dict:
+    """
+    Technical indicators of one or many price series, computed column-wise.
+
+    Inputs are Series (one symbol) or DataFrames with one column per symbol
+    and share the same index. Every indicator comes back in the same shape,
+    and is NaN until its window has filled.
+
+    Args:
+        close: Closing prices.
+        high, low: Daily highs and lows, needed for ATR.
+        volume: Traded volume, needed for the volume averages.
+
+    Returns:
+        dict: Indicator name -> Series/DataFrame. SMA_n and EMA_n for n in
+            MOVING_AVERAGE_WINDOWS, RSI_14, MACD, MACD_signal, MACD_hist
+            (12/26/9), BB_upper and BB_lower (20 days, 2 standard deviations),
+            ATR_14 and Volume_SMA_20/Volume_SMA_50.
+    """
+    indicators = {}
+    for window in MOVING_AVERAGE_WINDOWS:
+        indicators[f"SMA_{window}"] = close.rolling(window).mean()
+    for window in MOVING_AVERAGE_WINDOWS:
+        indicators[f"EMA_{window}"] = close.ewm(span=window, adjust=False, min_periods=window).mean()
+
+    change = close.diff()
+    gain = _wilder(change.clip(lower=0), 14)
+    loss = _wilder(-change.clip(upper=0), 14)
+    indicators["RSI_14"] = 100 - 100 / (1 + gain / loss)
+
+    macd = (
+        close.ewm(span=12, adjust=False, min_periods=12).mean()
+        - close.ewm(span=26, adjust=False, min_periods=26).mean()
+    )
+    indicators["MACD"] = macd
+    indicators["MACD_signal"] = macd.ewm(span=9, adjust=False, min_periods=9).mean()
+    indicators["MACD_hist"] = macd - indicators["MACD_signal"]
+
+    deviation = close.rolling(20).std(ddof=0)
+    indicators["BB_upper"] = indicators["SMA_20"] + 2 * deviation
+    indicators["BB_lower"] = indicators["SMA_20"] - 2 * deviation
+
+    if high is not None and low is not None:
+        previous_close = close.shift()
+        # fmax skips the NaN previous close of the first row
+        true_range = np.fmax(
+            high - low, np.fmax((high - previous_close).abs(), (low - previous_close).abs())
+        )
+        indicators["ATR_14"] = _wilder(true_range, 14)
+
+    if volume is not None:
+        indicators["Volume_SMA_20"] = volume.rolling(20).mean()
+        indicators["Volume_SMA_50"] = volume.rolling(50).mean()
+    return indicators
+
+
+def summarize_indicators(history: pd.DataFrame, points: int = 5) -> str:
+    """Latest value of every indicator as JSON, then the last ``points`` days as CSV."""
+    indicators = pd.DataFrame(
+        compute_indicators(
+            history["Close"], history.get("High"), history.get("Low"), history.get("Volume")
+        )
+    )
+    latest = indicators.iloc[-1]
+    close = history["Close"].iloc[-1]
+    summary = {
+        "date": history.index[-1].strftime("%Y-%m-%d"),
+        "close": round(float(close), 2),
+        **{name: round(float(value), 2) for name, value in latest.dropna().items()},
+    }
+    # A few readings the model would otherwise derive itself
+    if pd.notna(latest.get("SMA_200")):
+        summary["close_vs_SMA_200_pct"] = round(float((close / latest["SMA_200"] - 1) * 100), 2)
+    if pd.notna(latest["BB_upper"]) and latest["BB_upper"] != latest["BB_lower"]:
+        summary["BB_percent_b"] = round(
+            float((close - latest["BB_lower"]) / (latest["BB_upper"] - latest["BB_lower"])), 2
+        )
+    if pd.notna(latest.get("Volume_SMA_20")) and latest["Volume_SMA_20"]:
+        summary["volume_vs_SMA_20"] = round(float(history["Volume"].iloc[-1] / latest["Volume_SMA_20"]), 2)
+
+    recent = indicators[["RSI_14", "MACD", "MACD_signal", "SMA_20", "SMA_50"]].copy()
+    recent.insert(0, "Close", history["Close"])
+    recent = recent.tail(points).round(2)
+    return (
+        "Latest:\n"
+        + compact_json(summary)
+        + "\n\nRecent:\n"
+        + recent.to_csv(index_label="Date", date_format="%Y-%m-%d")
+    )
+
+
+def fetch_history_batch(symbols: list[str], period: str = "1mo", interval: str = "1d") -> dict:
+    """
+    History of several symbols, keyed by symbol.
+
+    Symbols without a fresh cached history are fetched together in a single
+    ``yf.download`` request, and each one's frame is cached under the same
+    key as ``fetch_history`` so single-symbol tools reuse it.
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+    histories = {}
+    for symbol in symbols:
+        cached = market_data_cache.peek((symbol, "history", period, interval), CACHE_TTLS["history"])
+        if cached is not None:
+            histories[symbol] = cached
+
+    missing = [symbol for symbol in symbols if symbol not in histories]
+    if missing:
+        data = yf.download(
+            missing,
+            period=period,
+            interval=interval,
+            group_by="ticker",
+            actions=True,
+            auto_adjust=True,
+            threads=True,
+            progress=False,
+        )
+        for symbol in missing:
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            history = _local_time_index(data[symbol].dropna(how="all"))
+            if history.empty:
+                continue
+            market_data_cache.put((symbol, "history", period, interval), history)
+            histories[symbol] = history
+    return histories
+
+
 class YahooFinance:
     """A class that provides various functions to fetch stock data from Yahoo Finance """
 
@@ -20,24 +410,27 @@ class YahooFinance:
             str: The current stock price or error message.
         """        
         try:
-            stock = yf.Ticker(symbol)
-            current_price = stock.info.get("regularMarketPrice", stock.info.get("currentPrice"))
+            info = fetch_info(symbol, kind="quote")
+            current_price = info.get("regularMarketPrice", info.get("currentPrice"))
             return f"{current_price:.4f}" if current_price else f"Could not fetch current price for {symbol}"
         except Exception as e:
             return f"Error fetching current price for {symbol}: {e}"
 
     @staticmethod
-    def get_company_info(symbol: str) -> str:
+    def get_company_info(symbol: str, fields: list[str] | None = None) -> str:
         """Use this function to get company information and overview for a given stock symbol.
 
         Args:
             symbol (str): The stock symbol.
+            fields (list[str], optional): Only return these keys, e.g. ["Name", "Sector"].
+                Any other Yahoo Finance info field, e.g. "heldPercentInsiders", can be asked
+                for too. Defaults to the full profile.
 
         Returns:
             str: JSON containing company profile and overview.
         """
         try:
-            company_info_full = yf.Ticker(symbol).info
+            company_info_full = fetch_info(symbol)
             if company_info_full is None:
                 return f"Could not fetch company info for {symbol}"
 
@@ -72,7 +465,9 @@ class YahooFinance:
                 "Gross Margins": company_info_full.get("grossMargins"),
                 "Ebitda Margins": company_info_full.get("ebitdaMargins"),
             }
-            return json.dumps(company_info_cleaned, indent=4)
+            return cap_tokens(
+                compact_json(project_fields(company_info_cleaned, company_info_full, fields))
+            )
         except Exception as e:
             return f"Error fetching company profile for {symbol}: {e}"
         
@@ -89,21 +484,27 @@ class YahooFinance:
                         Valid intervals: 1d,5d,1wk,1mo,3mo
 
         Returns:
-          str: The current stock price or error message.
+            str: CSV of Date, Open, High, Low, Close and Volume (plus Dividends and Stock Splits
+                when there were any), or an error message. Long histories are bucketed into at
+                most YF_HISTORY_MAX_ROWS consecutive periods, each dated by its last day.
         """
         try:
-            stock = yf.Ticker(symbol)
-            historical_price = stock.history(period=period, interval=interval)
-            return historical_price.to_json(orient="index")
+            historical_price = fetch_history(symbol, period, interval)
+            if historical_price.empty:
+                return f"Could not fetch historical prices for {symbol}"
+            return cap_tokens(history_to_csv(historical_price, interval))
         except Exception as e:
             return f"Error fetching historical prices for {symbol}: {e}"
 
     @staticmethod
-    def get_stock_fundamentals(symbol: str) -> str:
+    def get_stock_fundamentals(symbol: str, fields: list[str] | None = None) -> str:
         """Use this function to get fundamental data for a given stock symbol yfinance API.
 
         Args:
             symbol (str): The stock symbol.
+            fields (list[str], optional): Only return these keys, e.g. ["pe_ratio", "beta"].
+                Any other Yahoo Finance info field can be asked for too. Defaults to all
+                keys listed below.
 
         Returns:
             str: A JSON string containing fundamental data or an error message.
@@ -122,8 +523,7 @@ class YahooFinance:
                     - '52_week_low': The 52-week low price of the stock.
         """
         try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
+            info = fetch_info(symbol)
             fundamentals = {
                 "symbol": symbol,
                 "company_name": info.get("longName", ""),
@@ -138,7 +538,7 @@ class YahooFinance:
                 "52_week_high": info.get("fiftyTwoWeekHigh", "N/A"),
                 "52_week_low": info.get("fiftyTwoWeekLow", "N/A"),
             }
-            return json.dumps(fundamentals, indent=2)
+            return cap_tokens(compact_json(project_fields(fundamentals, info, fields)))
         except Exception as e:
             return f"Error getting fundamentals for {symbol}: {e}"
 
@@ -150,29 +550,37 @@ class YahooFinance:
             symbol (str): The stock symbol.
 
         Returns:
-            dict: JSON containing income statements or an empty dictionary.
+            str: CSV with one row per line item and one column per fiscal year, or an error message.
         """
         try:
-            stock = yf.Ticker(symbol)
-            financials = stock.financials
-            return financials.to_json(orient="index")
+            financials = _fetch(
+                symbol, "financials", "financials", lambda: yf.Ticker(symbol).financials
+            )
+            financials = financials.dropna(how="all")
+            financials.columns = [
+                c.strftime("%Y-%m-%d") if hasattr(c, "strftime") else c for c in financials.columns
+            ]
+            return cap_tokens(financials.to_csv(index_label="item", float_format="%.6g"))
         except Exception as e:
             return f"Error fetching income statements for {symbol}: {e}"
 
     @staticmethod
-    def get_key_financial_ratios(symbol: str) -> str:
+    def get_key_financial_ratios(symbol: str, fields: list[str] | None = None) -> str:
         """Use this function to get key financial ratios for a given stock symbol.
 
         Args:
             symbol (str): The stock symbol.
+            fields (list[str], optional): Yahoo Finance info fields to return, e.g.
+                ["trailingPE", "returnOnEquity"]. Defaults to KEY_RATIO_FIELDS.
 
         Returns:
-            dict: JSON containing key financial ratios.
+            str: JSON of valuation, margin, return, liquidity, leverage, growth and dividend
+                ratios (see KEY_RATIO_FIELDS); ratios Yahoo does not report are left out.
         """
         try:
-            stock = yf.Ticker(symbol)
-            key_ratios = stock.info
-            return json.dumps(key_ratios, indent=2)
+            info = fetch_info(symbol)
+            key_ratios = {field: info.get(field) for field in fields or KEY_RATIO_FIELDS}
+            return cap_tokens(compact_json(key_ratios))
         except Exception as e:
             return f"Error fetching key financial ratios for {symbol}: {e}"
 
@@ -184,12 +592,16 @@ class YahooFinance:
             symbol (str): The stock symbol.
 
         Returns:
-            str: JSON containing analyst recommendations.
+            str: CSV of the number of strong buy, buy, hold, sell and strong sell ratings per period.
         """
         try:
-            stock = yf.Ticker(symbol)
-            recommendations = stock.recommendations
-            return recommendations.to_json(orient="index")
+            recommendations = _fetch(
+                symbol,
+                "recommendations",
+                "recommendations",
+                lambda: yf.Ticker(symbol).recommendations,
+            )
+            return cap_tokens(recommendations.to_csv(index=False))
         except Exception as e:
             return f"Error fetching analyst recommendations for {symbol}: {e}"
 
@@ -202,27 +614,220 @@ class YahooFinance:
             num_stories (int): The number of news stories to return. Defaults to 3.
 
         Returns:
-            str: JSON containing company news and press releases.
+            str: JSON list of stories with title, summary, publisher, date and link.
         """
         try:
-            news = yf.Ticker(symbol).news
-            return json.dumps(news[:num_stories], indent=2)
+            news = _fetch(symbol, "news", "news", lambda: yf.Ticker(symbol).news)
+            stories = []
+            for item in news[:num_stories]:
+                # Newer yfinance releases nest each story under "content"
+                story = item.get("content", item)
+                stories.append(
+                    {
+                        key: value
+                        for key, value in {
+                            "title": story.get("title"),
+                            "summary": story.get("summary"),
+                            "publisher": (story.get("provider") or {}).get("displayName", story.get("publisher")),
+                            "date": story.get("pubDate", story.get("providerPublishTime")),
+                            "link": (story.get("canonicalUrl") or {}).get("url", story.get("link")),
+                        }.items()
+                        if value
+                    }
+                )
+            return cap_tokens(compact_json(stories))
         except Exception as e:
             return f"Error fetching company news for {symbol}: {e}"
 
-    def get_technical_indicators(symbol: str, period: str = "3mo") -> str:
+    @staticmethod
+    def get_technical_indicators(symbol: str, period: str = "2y", points: int = 5) -> str:
         """Use this function to get technical indicators for a given stock symbol.
 
         Args:
             symbol (str): The stock symbol.
-            period (str): The time period for which to retrieve technical indicators.
-                Valid periods: 1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max. Defaults to 3mo.
+            period (str): The daily price history to compute the indicators over.
+                Valid periods: 1y, 2y, 5y, 10y, max. Defaults to 2y; the 200-day averages
+                need at least 1y.
+            points (int): The number of recent days to list. Defaults to 5.
 
         Returns:
-            str: JSON containing technical indicators.
+            str: JSON of the latest close, SMA and EMA (20/50/200 days), RSI_14, MACD
+                (12/26/9), Bollinger Bands (20 days, 2 std), ATR_14, 20/50-day volume averages,
+                the close relative to SMA_200, Bollinger %B and volume relative to its 20-day
+                average, followed by a CSV of Close, RSI_14, MACD, MACD_signal, SMA_20 and SMA_50
+                over the last `points` days. Indicators without enough history are left out.
         """
         try:
-            indicators = yf.Ticker(symbol).history(period=period)
-            return indicators.to_json(orient="index")
+            history = fetch_history(symbol, period)
+            if history.empty:
+                return f"Could not fetch technical indicators for {symbol}"
+            return cap_tokens(summarize_indicators(history, points))
         except Exception as e:
-            return f"Error fetching technical indicators for {symbol}: {e}"    
\ No newline at end of file
+            return f"Error fetching technical indicators for {symbol}: {e}"
+
+    @staticmethod
+    def get_historical_stock_prices_batch(symbols: list[str], period: str = "1mo", interval: str = "1d") -> str:
+        """
+        Use this function to compare the historical prices of several symbols in one call,
+        e.g. a stock, its competitors and an index such as ^GSPC (S&P 500) or ^IXIC (Nasdaq).
+
+        Args:
+            symbols (list[str]): The stock symbols.
+            period (str): The period for which to retrieve historical prices. Defaults to "1mo".
+                        Valid periods: 1d,5d,1mo,3mo,6mo,1y,2y,5y,10y,ytd,max
+            interval (str): The interval between data points. Defaults to "1d".
+                        Valid intervals: 1d,5d,1wk,1mo,3mo
+
+        Returns:
+            str: A CSV summary per symbol (first and last close, change, high, low, average volume)
+                followed by a CSV table of closing prices with one column per symbol, or an error message.
+        """
+        try:
+            histories = fetch_history_batch(symbols, period, interval)
+            if not histories:
+                return f"Could not fetch historical prices for {', '.join(symbols)}"
+
+            summary = pd.DataFrame(
+                {
+                    symbol: {
+                        "first_close": history["Close"].iloc[0],
+                        "last_close": history["Close"].iloc[-1],
+                        "change_pct": (history["Close"].iloc[-1] / history["Close"].iloc[0] - 1) * 100,
+                        "high": history["High"].max() if "High" in history else history["Close"].max(),
+                        "low": history["Low"].min() if "Low" in history else history["Close"].min(),
+                        "avg_volume": history["Volume"].mean() if "Volume" in history else None,
+                    }
+                    for symbol, history in histories.items()
+                }
+            ).T
+            closes = downsample(
+                pd.DataFrame({symbol: history["Close"] for symbol, history in histories.items()})
+            )
+
+            result = "Summary:\n" + summary.round(2).to_csv(index_label="symbol")
+            result += "\nClose:\n" + closes.round(2).to_csv(
+                index_label="date", date_format=date_format(interval)
+            )
+            missing = [symbol for symbol in symbols if symbol.upper() not in histories]
+            if missing:
+                result += f"\nNo data for: {', '.join(missing)}"
+            return cap_tokens(result)
+        except Exception as e:
+            return f"Error fetching historical prices for {', '.join(symbols)}: {e}"
+
+    @staticmethod
+    def get_stock_fundamentals_batch(symbols: list[str]) -> str:
+        """Use this function to compare fundamental data of several stock symbols in one call.
+
+        Args:
+            symbols (list[str]): The stock symbols.
+
+        Returns:
+            str: A CSV table with one row per symbol and the columns company_name, sector, industry,
+                market_cap, pe_ratio, pb_ratio, dividend_yield, eps, beta, 52_week_high and 52_week_low,
+                followed by the symbols that could not be fetched, or an error message.
+        """
+        infos = {}
+        for symbol in symbols:
+            try:
+                infos[symbol] = fetch_info(symbol)
+            except Exception:
+                infos[symbol] = None
+        return fundamentals_table(infos)
+
+
+def fundamentals_table(infos: dict) -> str:
+    """CSV of the fundamentals in each symbol's info, None for symbols that failed."""
+    symbols = list(infos)
+    try:
+        rows = {
+            symbol: {
+                "company_name": info.get("longName", ""),
+                "sector": info.get("sector", ""),
+                "industry": info.get("industry", ""),
+                "market_cap": info.get("marketCap"),
+                "pe_ratio": info.get("forwardPE"),
+                "pb_ratio": info.get("priceToBook"),
+                "dividend_yield": info.get("dividendYield"),
+                "eps": info.get("trailingEps"),
+                "beta": info.get("beta"),
+                "52_week_high": info.get("fiftyTwoWeekHigh"),
+                "52_week_low": info.get("fiftyTwoWeekLow"),
+            }
+            for symbol, info in infos.items()
+            if info
+        }
+        if not rows:
+            return f"Could not fetch fundamentals for {', '.join(symbols)}"
+
+        result = pd.DataFrame(rows).T.to_csv(index_label="symbol", float_format="%.6g")
+        missing = [symbol for symbol, info in infos.items() if not info]
+        if missing:
+            result += f"\nNo data for: {', '.join(missing)}"
+        return cap_tokens(result)
+    except Exception as e:
+        return f"Error getting fundamentals for {', '.join(symbols)}: {e}"
+
+
+# yfinance calls of the async tools run here, so a burst of parallel tool
+# calls can't open more than YF_MAX_WORKERS connections to Yahoo at once
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("YF_MAX_WORKERS", "8")), thread_name_prefix="yfinance"
+)
+TOOL_TIMEOUT = float(os.getenv("YF_TIMEOUT", "20"))
+
+
+def _in_thread_pool(tool):
+    """Async version of a blocking YahooFinance tool, bounded by TOOL_TIMEOUT."""
+
+    @functools.wraps(tool)
+    async def wrapper(*args, **kwargs):
+        loop = asyncio.get_running_loop()
+        call = loop.run_in_executor(_executor, functools.partial(tool, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(call, TOOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            # The thread finishes in the background; a late result still
+            # lands in the cache for the next call
+            symbol = args[0] if args else kwargs.get("symbol")
+            return f"Timed out after {TOOL_TIMEOUT:g}s in {tool.__name__} for {symbol}, try again later"
+
+    return wrapper
+
+
+class AsyncYahooFinance:
+    """
+    The YahooFinance tools as coroutines, for agents running in an asyncio
+    loop. Each call runs on a bounded thread pool and gives up after
+    TOOL_TIMEOUT seconds, so parallel tool calls overlap and a stuck request
+    can't hold up the turn.
+    """
+
+    get_current_price = staticmethod(_in_thread_pool(YahooFinance.get_current_price))
+    get_company_info = staticmethod(_in_thread_pool(YahooFinance.get_company_info))
+    get_historical_stock_prices = staticmethod(_in_thread_pool(YahooFinance.get_historical_stock_prices))
+    get_stock_fundamentals = staticmethod(_in_thread_pool(YahooFinance.get_stock_fundamentals))
+    get_income_statements = staticmethod(_in_thread_pool(YahooFinance.get_income_statements))
+    get_key_financial_ratios = staticmethod(_in_thread_pool(YahooFinance.get_key_financial_ratios))
+    get_analyst_recommendations = staticmethod(_in_thread_pool(YahooFinance.get_analyst_recommendations))
+    get_company_news = staticmethod(_in_thread_pool(YahooFinance.get_company_news))
+    get_technical_indicators = staticmethod(_in_thread_pool(YahooFinance.get_technical_indicators))
+    get_historical_stock_prices_batch = staticmethod(_in_thread_pool(YahooFinance.get_historical_stock_prices_batch))
+
+    @staticmethod
+    @functools.wraps(YahooFinance.get_stock_fundamentals_batch)
+    async def get_stock_fundamentals_batch(symbols: list[str]) -> str:
+        # Yahoo has no bulk endpoint for info, so each symbol is a separate
+        # pool job; symbols still pending after TOOL_TIMEOUT count as failed
+        loop = asyncio.get_running_loop()
+        calls = {symbol: loop.run_in_executor(_executor, fetch_info, symbol) for symbol in symbols}
+        if not calls:
+            return fundamentals_table({})
+        await asyncio.wait(calls.values(), timeout=TOOL_TIMEOUT)
+        infos = {}
+        for symbol, call in calls.items():
+            if not call.done():
+                call.cancel()
+            failed = call.cancelled() or call.exception() is not None
+            infos[symbol] = None if failed else call.result()
+        return fundamentals_table(infos)